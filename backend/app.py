@@ -3,44 +3,648 @@ Flask application for audio file upload and waveform display
 Week 17/11/25 Milestone
 Enhanced with feature extraction - Week 24/11/25 Milestone
 Enhanced with similarity calculation - Week 1/12/25 Milestone
+
+Development: python app.py
+Production (from the backend folder):
+    WEB_CONCURRENCY=4 gunicorn -k gthread --threads 4 --preload -b 0.0.0.0:5000 app:app
 """
 
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, send_from_directory
 from flask_cors import CORS
+from flask_compress import Compress
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
 import os
+import base64
+import glob
+import gzip
+import hashlib
+import tempfile
+import time
 import librosa
 import numpy as np
+import orjson
+import soundfile as sf
 from feature_extractor import AudioFeatureExtractor
 from similarity_calculator import SimilarityCalculator
-import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import functools
+import threading
+
+try:
+    from threadpoolctl import threadpool_limits
+except ImportError:  # installed with scikit-learn, but optional here
+    threadpool_limits = None
 
 app = Flask(__name__, static_folder='../frontend', static_url_path='')
 CORS(app)
 
 # Configuration
-UPLOAD_FOLDER = 'uploads'
+UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', 'uploads')  # e.g. /dev/shm/uploads for RAM-backed I/O
 FEATURES_FOLDER = 'features'
 ALLOWED_EXTENSIONS = {'wav', 'mp3', 'ogg', 'flac', 'm4a'}
+ALLOWED_SUFFIXES = tuple(f'.{ext}' for ext in ALLOWED_EXTENSIONS)  # For str.endswith
+ALLOWED_TYPES_ERROR = f'File type not allowed. Allowed types: {", ".join(ALLOWED_EXTENSIONS)}'
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+MAX_BATCH_FILES = 16  # Files accepted by one /api/upload_batch request
+MAX_BATCH_SIZE = MAX_FILE_SIZE * MAX_BATCH_FILES
+WAVEFORM_POINTS = 1000  # Max waveform samples sent to the frontend
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # Copy/hash uploads in 1MB chunks
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['FEATURES_FOLDER'] = FEATURES_FOLDER
-app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
+app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE  # Raised per request by /api/upload_batch
+
+# Compress JSON responses on the fly; responses that already carry a
+# Content-Encoding (the precompressed features) are left alone
+app.config['COMPRESS_MIN_SIZE'] = 1024
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+Compress(app)
 
 # Create folders if they don't exist
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(FEATURES_FOLDER, exist_ok=True)
 
+# Absolute folder paths, resolved once at startup
+UPLOAD_DIR = os.path.abspath(UPLOAD_FOLDER)
+FEATURES_DIR = os.path.abspath(FEATURES_FOLDER)
+
 # Initialize feature extractor and similarity calculator
 feature_extractor = AudioFeatureExtractor()
 similarity_calculator = SimilarityCalculator()
 
+# Compile librosa's numba kernels now rather than on the first upload
+# (runs once in the gunicorn master with --preload)
+if os.environ.get('SKIP_LIBROSA_WARMUP', '0') != '1':
+    feature_extractor.warmup()
+
+# Background feature extraction in worker processes so uploads return without
+# waiting on librosa and extractions run in parallel, outside the GIL.
+# Each gunicorn worker has its own pool, so by default the cores are split
+# between the WEB_CONCURRENCY workers; EXTRACTION_WORKERS is per gunicorn worker.
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1))
+EXTRACTION_WORKERS = int(os.environ.get(
+    'EXTRACTION_WORKERS', max(1, (os.cpu_count() or 1) // WEB_CONCURRENCY)
+))
+extraction_executor = None  # created on first use, see get_extraction_executor()
+extraction_executor_pid = None
+pending_extractions = {}  # file_id -> Future of a running extraction
+# Guards extraction_executor and pending_extractions, which request threads
+# and the pool's done callbacks both update
+extraction_lock = threading.Lock()
+# A '<file_id>.pending' marker in UPLOAD_FOLDER records the pid of the process
+# that owns an extraction, so other server processes can tell it from an
+# upload orphaned by a crash; markers older than this are treated as stale
+PENDING_MARKER_SUFFIX = '.pending'
+PENDING_EXTRACTION_TIMEOUT = 600  # seconds
+worker_extractor = None  # AudioFeatureExtractor of an extraction worker process
+
+# In-memory index of saved feature files, rescanned when FEATURES_FOLDER changes
+FEATURE_FILE_SUFFIX = '_features.json'
+feature_index = {}  # file_id -> feature filename
+feature_index_lock = threading.Lock()
+feature_index_mtime = None
+
+# Parsed /api/features listing entries: feature filename -> (mtime_ns, entry)
+feature_listing_cache = {}
+
+
+def ojsonify(obj):
+    """
+    Build a JSON response with orjson instead of Flask's stdlib-json jsonify
+
+    NumPy arrays and scalars are serialized natively, so feature matrices
+    don't need to be converted to Python lists first.
+
+    Args:
+        obj: JSON-serializable object (may contain NumPy arrays)
+
+    Returns:
+        Flask response with application/json mimetype
+    """
+    return app.response_class(
+        orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY),
+        mimetype='application/json'
+    )
+
 
 def allowed_file(filename):
     """Check if file extension is allowed"""
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    return filename.lower().endswith(ALLOWED_SUFFIXES)
+
+
+def save_upload(stream, filename_base, filename_ext, max_size=MAX_FILE_SIZE):
+    """
+    Save an uploaded file stream and compute its content hash in a single pass
+
+    The stream is copied in 1MB chunks (instead of Werkzeug's small default
+    buffer) into a temp file, which is renamed once the hash is known.
+
+    Args:
+        stream: Uploaded file stream
+        filename_base: Sanitized original filename without extension
+        filename_ext: Original file extension
+        max_size: Largest accepted file size in bytes
+
+    Returns:
+        Tuple of (file_id, filepath) where file_id is the first 16 hex
+        characters of the SHA-256 digest
+
+    Raises:
+        RequestEntityTooLarge: As soon as more than max_size bytes were read
+    """
+    hasher = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(suffix='.part', dir=app.config['UPLOAD_FOLDER'])
+    try:
+        with os.fdopen(fd, 'wb') as dest:
+            size = 0
+            for chunk in iter(lambda: stream.read(UPLOAD_CHUNK_SIZE), b''):
+                size += len(chunk)
+                if size > max_size:
+                    raise RequestEntityTooLarge()
+                hasher.update(chunk)
+                dest.write(chunk)
+
+        file_id = hasher.hexdigest()[:16]
+        filepath = os.path.join(app.config['UPLOAD_FOLDER'], f"{filename_base}_{file_id}{filename_ext}")
+        os.replace(tmp_path, filepath)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return file_id, filepath
+
+
+def refresh_feature_index():
+    """
+    Rebuild feature_index if FEATURES_FOLDER changed since the last scan
+
+    Feature files are named <name>_<file_id>_features.json, so the file_id
+    is the last underscore-separated part before the suffix.
+    """
+    global feature_index_mtime
+
+    mtime = os.stat(app.config['FEATURES_FOLDER']).st_mtime_ns
+    with feature_index_lock:
+        if mtime == feature_index_mtime:
+            return
+
+        feature_index.clear()
+        for f in os.listdir(app.config['FEATURES_FOLDER']):
+            if f.endswith(FEATURE_FILE_SUFFIX):
+                file_id = f[:-len(FEATURE_FILE_SUFFIX)].rsplit('_', 1)[-1]
+                feature_index[file_id] = f
+        feature_index_mtime = mtime
+
+
+def register_feature_file(file_id, feature_filename):
+    """
+    Add a newly saved feature file to feature_index
+
+    Args:
+        file_id: Unique file identifier
+        feature_filename: Feature filename inside FEATURES_FOLDER
+    """
+    with feature_index_lock:
+        feature_index[file_id] = feature_filename
+
+
+def find_feature_file(file_id):
+    """
+    Find the saved feature file for a file_id
+
+    Args:
+        file_id: Unique file identifier
+
+    Returns:
+        Feature filename or None if not found
+    """
+    refresh_feature_index()
+    with feature_index_lock:
+        return feature_index.get(file_id)
+
+
+def summarize_audio(filepath, target_samples=WAVEFORM_POINTS):
+    """
+    Compute waveform display data without decoding the whole file at once
+
+    The file is streamed in blocks of `stride` frames; the first sample of each
+    block forms the downsampled waveform and every block contributes to the RMS.
+    Formats soundfile cannot decode (e.g. m4a) fall back to librosa.load.
+
+    Args:
+        filepath: Path to audio file
+        target_samples: Maximum number of waveform samples to return
+
+    Returns:
+        Dictionary with duration, sample rate, sample count, RMS and
+        waveform samples (float32 array)
+    """
+    try:
+        with sf.SoundFile(filepath) as audio:
+            sr = audio.samplerate
+            stride = max(1, audio.frames // target_samples)
+
+            # The header's frame count can overstate what actually decodes, so
+            # it only sizes the blocks; everything returned counts what was read
+            waveform_samples = np.empty(min(target_samples, audio.frames), dtype=np.float32)
+            blocks_read = 0
+            num_samples = 0
+            sum_squares = 0.0
+            for block in audio.blocks(blocksize=stride, dtype='float32', always_2d=True):
+                # Mix down to mono the same way librosa.load(mono=True) does,
+                # staying in float32 (mono files are used as-is, no copy)
+                mono = block[:, 0] if audio.channels == 1 else block.mean(axis=1, dtype=np.float32)
+                # Single-pass float32 BLAS dot, no temporary mono**2 array
+                sum_squares += float(np.dot(mono, mono))
+                num_samples += len(mono)
+                if blocks_read < len(waveform_samples):
+                    waveform_samples[blocks_read] = mono[0]
+                    blocks_read += 1
+            waveform_samples = waveform_samples[:blocks_read]
+    except RuntimeError:
+        # Not decodable by libsndfile, decode the whole file with librosa instead
+        y, sr = librosa.load(filepath, sr=None, mono=True)
+        return summarize_samples(y, sr, target_samples)
+
+    return {
+        'duration': num_samples / sr if sr else 0.0,
+        'sample_rate': int(sr),
+        'num_samples': int(num_samples),
+        'rms': float(np.sqrt(sum_squares / num_samples)) if num_samples else 0.0,
+        'waveform': waveform_samples
+    }
+
+
+def summarize_samples(y, sr, target_samples=WAVEFORM_POINTS):
+    """
+    Compute waveform display data from already decoded audio
+
+    Picks the same samples as summarize_audio's streaming path.
+
+    Args:
+        y: Mono audio samples
+        sr: Sample rate
+        target_samples: Maximum number of waveform samples to return
+
+    Returns:
+        Dictionary with duration, sample rate, sample count, RMS and
+        waveform samples (float32 array)
+    """
+    y = np.ascontiguousarray(y, dtype=np.float32)
+    num_samples = len(y)
+    sum_squares = float(np.dot(y, y))
+
+    # Uniform decimation as a strided view
+    stride = max(1, num_samples // target_samples)
+    waveform_samples = y[::stride][:target_samples]
+
+    return {
+        'duration': num_samples / sr if sr else 0.0,
+        'sample_rate': int(sr),
+        'num_samples': int(num_samples),
+        'rms': float(np.sqrt(sum_squares / num_samples)) if num_samples else 0.0,
+        'waveform': waveform_samples
+    }
+
+
+def encode_waveform(samples):
+    """
+    Pack waveform samples as base64 little-endian float32
+
+    Much smaller and cheaper to serialize than a JSON list of floats.
+    The frontend decodes it with atob + Float32Array.
+
+    Args:
+        samples: Waveform samples
+
+    Returns:
+        Base64 encoded string
+    """
+    return base64.b64encode(np.ascontiguousarray(samples, dtype='<f4').tobytes()).decode('ascii')
+
+
+def features_response_body(file_id, features):
+    """
+    Serialize the GET /api/features/<file_id> response body
+
+    Args:
+        file_id: Unique file identifier
+        features: Features dictionary
+
+    Returns:
+        JSON encoded bytes
+    """
+    return orjson.dumps({
+        'file_id': file_id,
+        'features': features,
+        'message': 'Features retrieved successfully'
+    }, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def precompress_features(file_id, feature_filepath):
+    """
+    Write the gzipped GET /api/features/<file_id> response next to the feature file
+
+    get_features serves this file directly so repeated requests skip loading
+    and serializing the features, and get ETag/304 handling for free.
+
+    Args:
+        file_id: Unique file identifier
+        feature_filepath: Path to the features JSON file
+
+    Returns:
+        Path to the .gz file
+    """
+    features = feature_extractor.load_features(feature_filepath)
+    gz_path = feature_filepath + '.gz'
+    tmp_path = f'{gz_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(gzip.compress(features_response_body(file_id, features), compresslevel=6))
+    os.replace(tmp_path, gz_path)
+    return gz_path
+
+
+def init_extraction_worker():
+    """
+    Set up an extraction worker process
+
+    Each worker builds its own AudioFeatureExtractor rather than receiving
+    the app's one, and compiles librosa's numba kernels before its first job.
+    """
+    global worker_extractor
+
+    # One BLAS/OpenMP thread per worker, the pools already cover every core
+    if threadpool_limits is not None:
+        threadpool_limits(limits=1)
+
+    worker_extractor = AudioFeatureExtractor()
+    if os.environ.get('SKIP_LIBROSA_WARMUP', '0') != '1':
+        worker_extractor.warmup()
+
+
+def get_extraction_executor():
+    """
+    Get the extraction process pool, creating it on first use
+
+    The pool is created lazily per process so gunicorn workers forked from a
+    --preload master never share the master's pool and its queues.
+
+    Returns:
+        ProcessPoolExecutor for feature extraction
+    """
+    global extraction_executor, extraction_executor_pid
+    with extraction_lock:
+        if extraction_executor is None or extraction_executor_pid != os.getpid():
+            extraction_executor = ProcessPoolExecutor(
+                max_workers=EXTRACTION_WORKERS, initializer=init_extraction_worker
+            )
+            extraction_executor_pid = os.getpid()
+        return extraction_executor
+
+
+def reset_extraction_executor(executor):
+    """
+    Drop a broken extraction pool so the next get_extraction_executor() builds a new one
+
+    A worker that segfaults or is OOM-killed breaks the whole pool: every
+    later submit raises BrokenProcessPool.
+
+    Args:
+        executor: The pool that broke (ignored if it was already replaced)
+    """
+    global extraction_executor
+    with extraction_lock:
+        if extraction_executor is executor:
+            extraction_executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def get_pending_extraction(file_id):
+    """
+    Get the Future of this process's extraction for a file_id
+
+    Args:
+        file_id: Unique file identifier
+
+    Returns:
+        Future of run_feature_extraction, or None if there is none
+    """
+    with extraction_lock:
+        return pending_extractions.get(file_id)
+
+
+def pending_marker_path(file_id):
+    """Path of the marker recording which process owns a file_id's extraction"""
+    return os.path.join(app.config['UPLOAD_FOLDER'], f'{file_id}{PENDING_MARKER_SUFFIX}')
+
+
+def remove_pending_marker(file_id):
+    """Delete a file_id's pending marker if it exists"""
+    try:
+        os.remove(pending_marker_path(file_id))
+    except FileNotFoundError:
+        pass
+
+
+def pending_marker_is_live(file_id):
+    """
+    Check whether a file_id's extraction is owned by a running server process
+
+    Args:
+        file_id: Unique file identifier
+
+    Returns:
+        True if the marker exists, is younger than PENDING_EXTRACTION_TIMEOUT
+        and its owner process is still alive
+    """
+    marker_path = pending_marker_path(file_id)
+    try:
+        with open(marker_path) as f:
+            owner_pid = int(f.read())
+        age = time.time() - os.path.getmtime(marker_path)
+    except (FileNotFoundError, ValueError):
+        return False
+    if age > PENDING_EXTRACTION_TIMEOUT:
+        return False
+    try:
+        os.kill(owner_pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # Alive, owned by another user
+    return True
+
+
+def submit_feature_extraction(file_id, filepath, feature_filepath, y, sr):
+    """
+    Start extracting features for an upload in the process pool
+
+    A pool broken by a crashed worker is replaced and the job submitted again.
+
+    Args:
+        file_id: Unique file identifier
+        filepath: Path to uploaded audio file
+        feature_filepath: Path to save the features JSON file
+        y: Decoded audio samples
+        sr: Sample rate
+    """
+    with open(pending_marker_path(file_id), 'w') as f:
+        f.write(str(os.getpid()))
+
+    executor = get_extraction_executor()
+    try:
+        future = executor.submit(run_feature_extraction, filepath, feature_filepath, y, sr)
+    except BrokenProcessPool:
+        reset_extraction_executor(executor)
+        executor = get_extraction_executor()
+        future = executor.submit(run_feature_extraction, filepath, feature_filepath, y, sr)
+    with extraction_lock:
+        pending_extractions[file_id] = future
+    # Outside the lock: an already finished future runs the callback right here
+    future.add_done_callback(
+        functools.partial(finish_feature_extraction, file_id, feature_filepath, executor)
+    )
+
+
+def run_feature_extraction(filepath, feature_filepath, y, sr):
+    """
+    Extract features for an uploaded file and save them (runs in an extraction worker process)
+
+    Args:
+        filepath: Path to uploaded audio file
+        feature_filepath: Path to save the features JSON file
+        y: Audio samples already decoded by upload_file
+        sr: Sample rate
+
+    Returns:
+        Extraction time in seconds
+    """
+    try:
+        features, extraction_time = worker_extractor.extract_all_features_from_array(
+            y, sr, os.path.basename(filepath)
+        )
+        worker_extractor.save_features(features, feature_filepath)
+        return extraction_time
+    except Exception:
+        # Clean up files if extraction failed
+        if os.path.exists(filepath):
+            os.remove(filepath)
+        worker_extractor.delete_features(feature_filepath)
+        raise
+
+
+def find_upload_files(file_id):
+    """
+    Find uploaded audio files for a file_id that haven't been removed yet
+
+    Args:
+        file_id: Unique file identifier
+
+    Returns:
+        List of upload paths
+    """
+    return glob.glob(os.path.join(app.config['UPLOAD_FOLDER'], f'*_{glob.escape(file_id)}.*'))
+
+
+def remove_upload_files(file_id):
+    """
+    Delete the uploaded audio for a file_id once its features are saved
+
+    The audio is never served back, and re-uploads hit the feature cache
+    by content hash, so keeping it would only grow UPLOAD_FOLDER.
+
+    Args:
+        file_id: Unique file identifier
+    """
+    for upload_path in find_upload_files(file_id):
+        try:
+            os.remove(upload_path)
+        except FileNotFoundError:
+            pass
+
+
+def finish_feature_extraction(file_id, feature_filepath, executor, future):
+    """
+    Precompress and index features once a worker has saved them, then delete the upload (runs in the app process)
+
+    A failed precompression is logged; the features are still indexed.
+    A job lost with its worker (BrokenProcessPool) never ran the worker's own
+    cleanup, so its upload and partial features are removed here, and the
+    broken pool is replaced. The failed future stays in pending_extractions
+    so the next status check reports the error.
+
+    Args:
+        file_id: Unique file identifier
+        feature_filepath: Path to the saved features JSON file
+        executor: Pool the job was submitted to
+        future: Future of the finished run_feature_extraction call
+    """
+    remove_pending_marker(file_id)
+    if future.cancelled() or future.exception() is not None:
+        if future.cancelled() or isinstance(future.exception(), BrokenProcessPool):
+            reset_extraction_executor(executor)
+            remove_upload_files(file_id)
+            feature_extractor.delete_features(feature_filepath)
+        return
+    # concurrent.futures only logs what a done callback raises, so a failed
+    # precompression must not skip indexing the saved features and removing
+    # the upload; get_features builds a missing .gz on demand
+    try:
+        precompress_features(file_id, feature_filepath)
+    except Exception:
+        app.logger.exception('Precompressing features for %s failed', file_id)
+    finally:
+        register_feature_file(file_id, os.path.basename(feature_filepath))
+        remove_upload_files(file_id)
+
+
+def check_pending_extraction(file_id):
+    """
+    Check whether features for a file_id are still being extracted
+
+    Finished extractions are removed from pending_extractions. Under a
+    multi-worker server the extraction may belong to another process, so an
+    upload without its feature file also counts as pending while its pending
+    marker names a live owner; otherwise the orphaned upload is removed.
+
+    Args:
+        file_id: Unique file identifier
+
+    Returns:
+        None if no extraction is pending, otherwise an error/pending response tuple
+    """
+    future = get_pending_extraction(file_id)
+    if future is None:
+        if not find_feature_file(file_id) and find_upload_files(file_id):
+            if pending_marker_is_live(file_id):
+                return ojsonify({
+                    'file_id': file_id,
+                    'status': 'pending',
+                    'message': 'Feature extraction in progress'
+                }), 202
+            # Left behind by a crashed or killed server process
+            remove_pending_marker(file_id)
+            remove_upload_files(file_id)
+        return None
+
+    if not future.done():
+        return ojsonify({
+            'file_id': file_id,
+            'status': 'pending',
+            'message': 'Feature extraction in progress'
+        }), 202
+
+    with extraction_lock:
+        # Unless a new upload of the same file already replaced it
+        if pending_extractions.get(file_id) is future:
+            del pending_extractions[file_id]
+    error = future.exception()
+    if error is not None:
+        return ojsonify({'error': f'Error extracting features: {str(error)}'}), 500
+    return None
 
 
 @app.route('/')
@@ -49,99 +653,158 @@ def index():
     return send_from_directory(app.static_folder, 'index.html')
 
 
-@app.route('/api/upload', methods=['POST'])
-def upload_file():
+def process_upload(file):
     """
-    Handle audio file upload, return waveform data, and extract features
+    Validate and save one uploaded file, then start or reuse its feature extraction
 
-    Week 24/11/25: Enhanced with feature extraction
+    Shared by the single and batch upload endpoints. Extraction is submitted
+    to the process pool, so a batch keeps all workers busy while the
+    response is built.
+
+    Args:
+        file: Werkzeug FileStorage from request.files
 
     Returns:
-        JSON with audio metadata, waveform samples, and feature extraction status
+        Tuple of (response dict, HTTP status code)
     """
-    # Check if file is present in request
-    if 'file' not in request.files:
-        return jsonify({'error': 'No file part in request'}), 400
-
-    file = request.files['file']
-
     # Check if file is selected
     if file.filename == '':
-        return jsonify({'error': 'No file selected'}), 400
+        return {'error': 'No file selected'}, 400
 
     # Check if file type is allowed
     if not allowed_file(file.filename):
-        return jsonify({
-            'error': f'File type not allowed. Allowed types: {", ".join(ALLOWED_EXTENSIONS)}'
-        }), 400
+        return {'error': ALLOWED_TYPES_ERROR, 'filename': file.filename}, 400
 
+    filepath = feature_filepath = None
     try:
-        # Generate unique file ID to avoid conflicts
-        file_id = str(uuid.uuid4())[:8]
         original_filename = secure_filename(file.filename)
         filename_base, filename_ext = os.path.splitext(original_filename)
-        filename = f"{filename_base}_{file_id}{filename_ext}"
-
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
 
-        # Load audio file with librosa
-        y, sr = librosa.load(filepath, sr=None, mono=True)
-
-        # Get audio metadata
-        duration = librosa.get_duration(y=y, sr=sr)
+        # Content hash as file ID: identical uploads map to the same features
+        file_id, filepath = save_upload(file.stream, filename_base, filename_ext)
 
-        # Downsample waveform for visualization (max 1000 points)
-        # This makes it efficient to send to frontend
-        target_samples = min(1000, len(y))
-        if len(y) > target_samples:
-            # Use linear interpolation to downsample
-            indices = np.linspace(0, len(y) - 1, target_samples, dtype=int)
-            waveform_samples = y[indices].tolist()
+        # ===== Week 24/11/25: Extract and save features (in the background) =====
+        cached_feature_file = find_feature_file(file_id)
+        if cached_feature_file:
+            # Same audio was uploaded before, skip extraction entirely
+            feature_filename = cached_feature_file
+            feature_status = 'cached'
         else:
-            waveform_samples = y.tolist()
-
-        # Calculate RMS energy for display
-        rms = float(np.sqrt(np.mean(y**2)))
-
-        # ===== Week 24/11/25: Extract and save features =====
-        features, extraction_time = feature_extractor.extract_all_features(filepath)
-
-        # Save features to JSON
-        feature_filename = f"{filename_base}_{file_id}_features.json"
-        feature_filepath = os.path.join(app.config['FEATURES_FOLDER'], feature_filename)
-        feature_extractor.save_features(features, feature_filepath)
+            feature_filename = f"{filename_base}_{file_id}{FEATURE_FILE_SUFFIX}"
+            feature_status = 'pending'
+
+        running = get_pending_extraction(file_id)
+        if feature_status == 'pending' and (running is None or running.done()):
+            # Decode once and hand the samples to the extraction worker
+            # rather than letting it decode the file again
+            y, sr = librosa.load(filepath, sr=None, mono=True)
+            audio_summary = summarize_samples(y, sr)
+
+            feature_filepath = os.path.join(app.config['FEATURES_FOLDER'], feature_filename)
+            submit_feature_extraction(file_id, filepath, feature_filepath, y, sr)
+        else:
+            # No extraction needed, stream the file for waveform display data
+            audio_summary = summarize_audio(filepath)
+            if feature_status == 'cached':
+                os.remove(filepath)
 
         # Prepare response
         response = {
             'file_id': file_id,
             'filename': original_filename,
-            'duration': float(duration),
-            'sample_rate': int(sr),
-            'num_samples': len(y),
-            'rms': rms,
-            'waveform': waveform_samples,
+            'duration': audio_summary['duration'],
+            'sample_rate': audio_summary['sample_rate'],
+            'num_samples': audio_summary['num_samples'],
+            'rms': audio_summary['rms'],
+            'waveform_b64': encode_waveform(audio_summary['waveform']),
+            'waveform_dtype': 'float32',
+            'waveform_len': len(audio_summary['waveform']),
             'features': {
-                'extracted': True,
-                'extraction_time': extraction_time,
-                'feature_file': feature_filename,
-                'mfcc_shape': features['mfcc']['shape'],
-                'chroma_shape': features['chroma']['shape'],
-                'tempo': features['audio_info']['tempo'],
-                'num_beats': features['audio_info']['num_beats']
-            },
-            'message': 'File uploaded and features extracted successfully'
+                'extracted': feature_status == 'cached',
+                'status': feature_status,
+                'feature_file': feature_filename
+            }
         }
 
-        return jsonify(response), 200
+        if feature_status == 'cached':
+            response['message'] = 'File uploaded, features loaded from cache'
+            return response, 200
+
+        response['message'] = 'File uploaded, feature extraction started'
+        return response, 202
+
+    except RequestEntityTooLarge:
+        return {'error': 'File too large', 'filename': original_filename}, 413
 
     except Exception as e:
         # Clean up files if processing failed
-        if 'filepath' in locals() and os.path.exists(filepath):
+        if filepath and os.path.exists(filepath):
             os.remove(filepath)
-        if 'feature_filepath' in locals() and os.path.exists(feature_filepath):
-            os.remove(feature_filepath)
-        return jsonify({'error': f'Error processing audio file: {str(e)}'}), 500
+        if feature_filepath:
+            feature_extractor.delete_features(feature_filepath)
+        return {'error': f'Error processing audio file: {str(e)}'}, 500
+
+
+@app.route('/api/upload', methods=['POST'])
+def upload_file():
+    """
+    Handle audio file upload, return waveform data, and extract features
+
+    Week 24/11/25: Enhanced with feature extraction
+    Feature extraction runs in the background; poll GET /api/features/<file_id>
+    until it stops returning 202. The file_id is a content hash, so uploading
+    the same audio again reuses its existing features.
+
+    Returns:
+        JSON with audio metadata, waveform samples, and feature extraction status
+    """
+    # Reject oversized uploads from the Content-Length header, before any of
+    # the body is read
+    if request.content_length and request.content_length > MAX_FILE_SIZE:
+        return ojsonify({'error': 'File too large'}), 413
+
+    # Check if file is present in request
+    if 'file' not in request.files:
+        return ojsonify({'error': 'No file part in request'}), 400
+
+    response, status = process_upload(request.files['file'])
+    return ojsonify(response), status
+
+
+@app.route('/api/upload_batch', methods=['POST'])
+def upload_batch():
+    """
+    Handle several audio files in one multipart request
+
+    Every part named 'file' is processed like a single upload; extractions
+    run concurrently in the process pool. Each entry of the response carries
+    its own status_code, so one bad file does not fail the whole batch.
+    Only this route accepts request bodies up to MAX_BATCH_SIZE; each file
+    is still limited to MAX_FILE_SIZE.
+
+    Returns:
+        JSON {'files': [...]} in upload order; 202 if any extraction is
+        still pending, otherwise 200
+    """
+    # Raise the body limit for this request only, before the form is parsed
+    request.max_content_length = MAX_BATCH_SIZE
+    if request.content_length and request.content_length > MAX_BATCH_SIZE:
+        return ojsonify({'error': 'Batch too large'}), 413
+
+    files = request.files.getlist('file')
+    if not files:
+        return ojsonify({'error': 'No file part in request'}), 400
+    if len(files) > MAX_BATCH_FILES:
+        return ojsonify({'error': f'Too many files, at most {MAX_BATCH_FILES} per batch'}), 400
+
+    results = []
+    for file in files:
+        response, status = process_upload(file)
+        response['status_code'] = status
+        results.append(response)
+
+    pending = any(result['status_code'] == 202 for result in results)
+    return ojsonify({'files': results}), 202 if pending else 200
 
 
 @app.route('/api/features/<file_id>', methods=['GET'])
@@ -150,6 +813,9 @@ def get_features(file_id):
     Retrieve extracted features for a specific file
 
     Week 24/11/25: New endpoint for feature retrieval
+    Returns 202 while the upload's feature extraction is still running.
+    With ?status=1 only the status code is returned (202 pending, 200 ready,
+    no body), so polling clients don't download the features.
 
     Args:
         file_id: Unique file identifier
@@ -157,28 +823,53 @@ def get_features(file_id):
     Returns:
         JSON with extracted features or error if not found
     """
+    status_only = request.args.get('status') == '1'
     try:
+        pending_response = check_pending_extraction(file_id)
+        if pending_response:
+            if status_only and pending_response[1] == 202:
+                return app.response_class(status=202)
+            return pending_response
+
         # Find feature file matching the file_id
-        feature_files = [f for f in os.listdir(app.config['FEATURES_FOLDER'])
-                        if file_id in f and f.endswith('_features.json')]
+        feature_file = find_feature_file(file_id)
 
-        if not feature_files:
-            return jsonify({
+        if not feature_file:
+            return ojsonify({
                 'error': f'Features not found for file_id: {file_id}'
             }), 404
 
+        if status_only:
+            return app.response_class(status=200)
+
+        feature_filepath = os.path.join(app.config['FEATURES_FOLDER'], feature_file)
+
+        # Serve the precompressed response directly, with ETag/304 support
+        if request.accept_encodings['gzip']:
+            gz_path = feature_filepath + '.gz'
+            if not os.path.exists(gz_path):
+                # Features saved before precompression existed (or cached uploads)
+                precompress_features(file_id, feature_filepath)
+
+            # send_from_directory resolves relative paths against the app root, not the cwd
+            response = send_from_directory(
+                FEATURES_DIR, os.path.basename(gz_path),
+                mimetype='application/json', conditional=True
+            )
+            response.headers['Content-Encoding'] = 'gzip'
+            response.vary.add('Accept-Encoding')
+            return response
+
         # Load and return features
-        feature_filepath = os.path.join(app.config['FEATURES_FOLDER'], feature_files[0])
         features = feature_extractor.load_features(feature_filepath)
 
-        return jsonify({
-            'file_id': file_id,
-            'features': features,
-            'message': 'Features retrieved successfully'
-        }), 200
+        return app.response_class(
+            features_response_body(file_id, features),
+            mimetype='application/json'
+        ), 200
 
     except Exception as e:
-        return jsonify({'error': f'Error retrieving features: {str(e)}'}), 500
+        return ojsonify({'error': f'Error retrieving features: {str(e)}'}), 500
 
 
 @app.route('/api/features', methods=['GET'])
@@ -192,32 +883,48 @@ def list_features():
         JSON with list of available feature files
     """
     try:
-        feature_files = [f for f in os.listdir(app.config['FEATURES_FOLDER'])
-                        if f.endswith('_features.json')]
+        # Only the small JSON sidecars are read (matrices live in the .npy files),
+        # and each one only again after it changes on disk
+        with os.scandir(FEATURES_DIR) as entries:
+            feature_files = sorted(
+                (entry.name, entry.stat().st_mtime_ns) for entry in entries
+                if entry.name.endswith(FEATURE_FILE_SUFFIX)
+            )
 
         feature_list = []
-        for feature_file in feature_files:
-            feature_filepath = os.path.join(app.config['FEATURES_FOLDER'], feature_file)
-            features = feature_extractor.load_features(feature_filepath)
+        for feature_file, mtime in feature_files:
+            cached = feature_listing_cache.get(feature_file)
+            if cached and cached[0] == mtime:
+                feature_list.append(cached[1])
+                continue
+
+            feature_filepath = os.path.join(FEATURES_DIR, feature_file)
+            features = feature_extractor.load_features(feature_filepath, load_arrays=False)
 
             if features:
-                feature_list.append({
+                listing_entry = {
                     'filename': feature_file,
                     'original_file': features['audio_info']['filename'],
                     'duration': features['audio_info']['duration'],
                     'extraction_time': features['extraction_time'],
                     'mfcc_shape': features['mfcc']['shape'],
                     'chroma_shape': features['chroma']['shape']
-                })
+                }
+                feature_listing_cache[feature_file] = (mtime, listing_entry)
+                feature_list.append(listing_entry)
 
-        return jsonify({
+        # Forget files that were removed
+        for feature_file in feature_listing_cache.keys() - {f for f, _ in feature_files}:
+            feature_listing_cache.pop(feature_file, None)
+
+        return ojsonify({
             'count': len(feature_list),
             'features': feature_list,
             'message': f'Found {len(feature_list)} feature file(s)'
         }), 200
 
     except Exception as e:
-        return jsonify({'error': f'Error listing features: {str(e)}'}), 500
+        return ojsonify({'error': f'Error listing features: {str(e)}'}), 500
 
 
 @app.route('/api/compare', methods=['POST'])
@@ -230,67 +937,76 @@ def compare_files():
     Request body:
         {
             "file_id_1": "abc123",
-            "file_id_2": "def456"
+            "file_id_2": "def456",
+            "method": "full"    (optional, "quick" compares mean vectors only)
         }
 
     Returns:
         JSON with similarity scores and detailed comparison results
+        (202 while either file's features are still being extracted)
     """
     try:
         data = request.get_json()
 
         if not data or 'file_id_1' not in data or 'file_id_2' not in data:
-            return jsonify({
+            return ojsonify({
                 'error': 'Both file_id_1 and file_id_2 are required'
             }), 400
 
         file_id_1 = data['file_id_1']
         file_id_2 = data['file_id_2']
 
-        # Find feature files for both file IDs
-        feature_files = os.listdir(app.config['FEATURES_FOLDER'])
-
-        feature_file_1 = None
-        feature_file_2 = None
+        for file_id in (file_id_1, file_id_2):
+            pending_response = check_pending_extraction(file_id)
+            if pending_response:
+                return pending_response
 
-        for f in feature_files:
-            if file_id_1 in f and f.endswith('_features.json'):
-                feature_file_1 = os.path.join(app.config['FEATURES_FOLDER'], f)
-            if file_id_2 in f and f.endswith('_features.json'):
-                feature_file_2 = os.path.join(app.config['FEATURES_FOLDER'], f)
+        # Find feature files for both file IDs
+        feature_file_1 = find_feature_file(file_id_1)
+        feature_file_2 = find_feature_file(file_id_2)
 
         if not feature_file_1:
-            return jsonify({
+            return ojsonify({
                 'error': f'Features not found for file_id_1: {file_id_1}'
             }), 404
 
         if not feature_file_2:
-            return jsonify({
+            return ojsonify({
                 'error': f'Features not found for file_id_2: {file_id_2}'
             }), 404
 
         # Calculate similarity
-        comparison_results = similarity_calculator.compare_audio_files(
-            feature_file_1, feature_file_2
+        method = data.get('method', 'full')
+        if method == 'quick':
+            compare = similarity_calculator.quick_compare_audio_files
+        elif method == 'full':
+            compare = similarity_calculator.compare_audio_files
+        else:
+            return ojsonify({'error': "method must be 'full' or 'quick'"}), 400
+
+        comparison_results = compare(
+            os.path.join(app.config['FEATURES_FOLDER'], feature_file_1),
+            os.path.join(app.config['FEATURES_FOLDER'], feature_file_2)
         )
 
         response = {
             'file_id_1': file_id_1,
             'file_id_2': file_id_2,
+            'method': method,
             'comparison': comparison_results,
             'message': 'Comparison completed successfully'
         }
 
-        return jsonify(response), 200
+        return ojsonify(response), 200
 
     except Exception as e:
-        return jsonify({'error': f'Error comparing files: {str(e)}'}), 500
+        return ojsonify({'error': f'Error comparing files: {str(e)}'}), 500
 
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({
+    return ojsonify({
         'status': 'healthy',
         'message': 'Audio upload service with feature extraction and similarity calculation is running'
     }), 200
@@ -298,7 +1014,9 @@ def health_check():
 
 if __name__ == '__main__':
     print("Starting Flask server for audio upload, waveform display, and similarity calculation...")
-    print(f"Upload folder: {os.path.abspath(UPLOAD_FOLDER)}")
-    print(f"Features folder: {os.path.abspath(FEATURES_FOLDER)}")
+    print(f"Upload folder: {UPLOAD_DIR}")
+    print(f"Features folder: {FEATURES_DIR}")
     print(f"Allowed file types: {', '.join(ALLOWED_EXTENSIONS)}")
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    print("Development server only, see the module docstring for running under gunicorn")
+    # Set FLASK_DEBUG=0 to disable the debugger and reloader (which imports the app twice)
+    app.run(debug=os.environ.get('FLASK_DEBUG', '1') == '1', host='0.0.0.0', port=5000)
@@ -0,0 +1,34 @@
+"""
+pytest fixtures shared by the test modules, built once per session
+"""
+
+import os
+
+import pytest
+
+# One on-disk cache for the compiled kernels of every module the tests
+# import, reused across runs even when a source directory is read-only.
+# conftest.py loads before any test module, so this is set before numba is
+# first imported.
+os.environ.setdefault('NUMBA_CACHE_DIR',
+                      os.path.join(os.path.dirname(os.path.abspath(__file__)), '__pycache__', 'numba'))
+
+from fixtures import get_similarity_corpus, get_test_audio
+
+
+@pytest.fixture(scope='session')
+def test_audio():
+    """(samples, sample rate, path) of experiments/test_audio.wav"""
+    return get_test_audio()
+
+
+@pytest.fixture(scope='session')
+def test_files():
+    """(filename, description) of each similarity test WAV"""
+    return get_similarity_corpus()[0]
+
+
+@pytest.fixture(scope='session')
+def feature_files():
+    """Feature file paths of the similarity test WAVs"""
+    return get_similarity_corpus()[1]
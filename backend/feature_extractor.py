@@ -6,11 +6,246 @@ Extracts audio features (MFCC and Chroma) for similarity detection
 """
 
 import librosa
+import numba
 import numpy as np
-import json
+import scipy.fft
+import scipy.signal
+import functools
+import hashlib
+import orjson
 import os
-from typing import Dict, Tuple, Optional
+import sys
+from typing import Dict, List, Tuple, Optional
 import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from threadpoolctl import threadpool_limits
+except ImportError:  # installed with scikit-learn, but optional here
+    threadpool_limits = None
+
+
+# Feature matrices stored in .npy files next to the JSON sidecar
+# (feature group, key inside the group)
+ARRAY_FEATURES = (('mfcc', 'mfcc'), ('chroma', 'chroma'))
+
+# Matrices are stored quantized: MFCCs as float16, Chroma (normalized to
+# [0, 1]) as uint8 steps of CHROMA_SCALE. Both are float32 again once loaded.
+CHROMA_SCALE = 1.0 / 255
+
+# Decoded files kept in memory by load_audio(); decoded tracks are large
+# (a few minutes at 44.1 kHz is tens of MB), so keep this small
+LOAD_CACHE_SIZE = 8
+
+# Part of the feature cache key (see AudioFeatureExtractor.cache_path_for);
+# bump when the extracted features change so old cache entries are ignored
+FEATURE_CACHE_VERSION = 1
+
+
+def quantize_feature_array(group: str, array: np.ndarray) -> np.ndarray:
+    """
+    Convert a feature matrix to its storage dtype
+
+    Args:
+        group: Feature group ('mfcc' or 'chroma')
+        array: Feature matrix
+
+    Returns:
+        float16 MFCC or uint8 Chroma matrix (C-contiguous)
+    """
+    if group == 'chroma':
+        steps = np.rint(np.clip(array, 0.0, 1.0) / CHROMA_SCALE)
+        return np.ascontiguousarray(steps, dtype=np.uint8)
+    return np.ascontiguousarray(array, dtype=np.float16)
+
+
+def dequantize_feature_array(array: np.ndarray) -> np.ndarray:
+    """
+    Convert a stored feature matrix back to float32
+
+    The matrix is always copied into a new float32 array (in one pass,
+    without an intermediate), so a memory-mapped input is read in full here.
+
+    Args:
+        array: Matrix as stored (float16 MFCC or uint8 Chroma)
+
+    Returns:
+        float32 feature matrix
+    """
+    if array.dtype == np.uint8:
+        return np.multiply(array, np.float32(CHROMA_SCALE), dtype=np.float32)
+    return array.astype(np.float32)
+
+
+def array_path_for(feature_path: str, group: str) -> str:
+    """
+    Get the path of the .npy file holding one feature matrix
+
+    Args:
+        feature_path: Path to the features JSON sidecar
+        group: Feature group ('mfcc' or 'chroma')
+
+    Returns:
+        Path to the matching .npy file
+    """
+    return f'{os.path.splitext(feature_path)[0]}_{group}.npy'
+
+
+def unit_vector(vec: np.ndarray) -> np.ndarray:
+    """
+    L2-normalize a vector so cosine similarity becomes a plain dot product
+
+    Args:
+        vec: Feature vector
+
+    Returns:
+        Vector scaled to unit length (all zeros stays all zeros)
+    """
+    vec = np.asarray(vec, dtype=np.float32)
+    return vec / (np.linalg.norm(vec) + 1e-9)
+
+
+@functools.lru_cache(maxsize=LOAD_CACHE_SIZE)
+def _cached_load(path: str, sr: Optional[int], mtime_ns: int, size: int) -> Tuple[np.ndarray, int]:
+    """
+    Decode an audio file once per (path, sample rate, modification)
+
+    mtime_ns and size are only part of the cache key, so a file rewritten
+    in place is decoded again instead of served stale.
+    """
+    y, sr = librosa.load(path, sr=sr, mono=True)
+    # Shared between callers: make accidental in-place edits fail loudly
+    y.flags.writeable = False
+    return y, sr
+
+
+def load_audio(filepath: str, sr: Optional[int] = None) -> Tuple[np.ndarray, int]:
+    """
+    librosa.load(filepath, sr=sr, mono=True) with an LRU cache of decoded files
+
+    The returned array is shared with later calls for the same file and is
+    read-only; use y.copy() before modifying it.
+
+    Args:
+        filepath: Path to audio file
+        sr: Target sample rate (None keeps the native rate)
+
+    Returns:
+        Tuple of (mono audio time series, sample rate)
+    """
+    stat = os.stat(filepath)
+    return _cached_load(os.path.abspath(filepath), sr, stat.st_mtime_ns, stat.st_size)
+
+
+@numba.njit(cache=True)
+def _row_stats(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Mean, standard deviation, minimum and maximum of every row in one scan
+
+    Each row is read once (Welford update in float64) instead of four
+    separate numpy reductions over the whole matrix.
+
+    Args:
+        matrix: Feature matrix (n_features x n_frames), C-contiguous
+
+    Returns:
+        Tuple of (mean, std, min, max), one value per row
+    """
+    n_rows, n_cols = matrix.shape
+    mean = np.empty(n_rows)
+    std = np.empty(n_rows)
+    lo = np.empty(n_rows)
+    hi = np.empty(n_rows)
+
+    for r in range(n_rows):
+        avg = 0.0
+        m2 = 0.0
+        row_lo = np.inf
+        row_hi = -np.inf
+        for c in range(n_cols):
+            x = np.float64(matrix[r, c])
+            delta = x - avg
+            avg += delta / (c + 1)
+            m2 += delta * (x - avg)
+            if x < row_lo:
+                row_lo = x
+            if x > row_hi:
+                row_hi = x
+        mean[r] = avg
+        std[r] = np.sqrt(m2 / n_cols)
+        lo[r] = row_lo
+        hi[r] = row_hi
+
+    return mean, std, lo, hi
+
+
+def load_feature_file(filepath: str, load_arrays: bool = True, mmap: bool = False) -> Optional[Dict]:
+    """
+    Load features saved by AudioFeatureExtractor.save_features
+
+    The JSON sidecar holds metadata and statistics; the MFCC and Chroma
+    matrices are read from the .npy files next to it. Older JSON files that
+    still contain the matrices are returned as they are.
+
+    Args:
+        filepath: Path to features JSON file
+        load_arrays: Also load the MFCC/Chroma matrices (float32 arrays)
+        mmap: Open the .npy files memory-mapped; the quantized matrices are
+            still dequantized into new arrays
+
+    Returns:
+        Features dictionary or None if file doesn't exist
+    """
+    features = load_stats(filepath)
+    if features is None or not load_arrays:
+        return features
+
+    for group, key in ARRAY_FEATURES:
+        array = load_feature_array(filepath, group, mmap=mmap)
+        if array is not None:
+            features[group][key] = array
+
+    return features
+
+
+def load_stats(filepath: str) -> Optional[Dict]:
+    """
+    Load only the metadata and statistics of saved features (the JSON sidecar)
+
+    Args:
+        filepath: Path to features JSON file
+
+    Returns:
+        Features dictionary without the MFCC/Chroma matrices, or None if file doesn't exist
+    """
+    if not os.path.exists(filepath):
+        return None
+
+    with open(filepath, 'rb') as f:
+        return orjson.loads(f.read())
+
+
+def load_feature_array(filepath: str, group: str, mmap: bool = True,
+                       dequantize: bool = True) -> Optional[np.ndarray]:
+    """
+    Load one saved feature matrix
+
+    Args:
+        filepath: Path to features JSON file
+        group: Feature group ('mfcc' or 'chroma')
+        mmap: Memory-map the file instead of reading it
+        dequantize: Convert to float32, which copies float16/uint8 matrices
+            (see dequantize_feature_array); otherwise the stored matrix is
+            returned, still memory-mapped when mmap is set
+
+    Returns:
+        Feature matrix (n_coefficients x time_frames) or None if it wasn't saved
+    """
+    array_path = array_path_for(filepath, group)
+    if not os.path.exists(array_path):
+        return None
+    array = np.load(array_path, mmap_mode='r' if mmap else None)
+    return dequantize_feature_array(array) if dequantize else array
 
 
 class AudioFeatureExtractor:
@@ -18,17 +253,87 @@ class AudioFeatureExtractor:
     Extract MFCC and Chroma features from audio files
     """
 
-    def __init__(self):
-        """Initialize feature extractor with default parameters"""
+    def __init__(self, cache_dir: Optional[str] = None):
+        """
+        Initialize feature extractor with default parameters
+
+        Args:
+            cache_dir: Directory for cached extraction results (see
+                extract_all_features); None disables the cache
+        """
         # MFCC parameters
         self.n_mfcc = 13  # Standard number of MFCC coefficients
         self.n_fft = 2048  # FFT window size
         self.hop_length = 512  # Number of samples between frames
 
+        self.n_mels = 128  # Mel bands used before the DCT (librosa default)
+
         # Chroma parameters
         self.n_chroma = 12  # 12 pitch classes (C, C#, D, ..., B)
 
-    def extract_mfcc(self, y: np.ndarray, sr: int) -> Dict:
+        # Mel filter banks per sample rate, built once instead of on every
+        # librosa.feature.mfcc call. The common rate is prebuilt so a
+        # module-level extractor pays for it at import time (before forking
+        # when the app runs under gunicorn --preload).
+        self._mel_basis_cache = {}
+        self.get_mel_basis(22050)
+
+        # Periodic Hann window, the same one librosa.stft builds on every call
+        self.window = scipy.signal.get_window('hann', self.n_fft, fftbins=True)
+
+        self._warmed_up = False
+
+        self.cache_dir = cache_dir
+
+    def get_mel_basis(self, sr: int) -> np.ndarray:
+        """
+        Get the (cached) Mel filter bank for a sample rate
+
+        Chroma filter banks are not cached the same way because they depend
+        on the tuning estimated from each file.
+
+        Args:
+            sr: Sample rate
+
+        Returns:
+            Mel filter bank (n_mels x (1 + n_fft/2))
+        """
+        mel_basis = self._mel_basis_cache.get(sr)
+        if mel_basis is None:
+            mel_basis = librosa.filters.mel(sr=sr, n_fft=self.n_fft, n_mels=self.n_mels)
+            self._mel_basis_cache[sr] = mel_basis
+        return mel_basis
+
+    def power_spectrogram(self, y: np.ndarray) -> np.ndarray:
+        """
+        Compute the power spectrogram shared by MFCC and Chroma extraction
+
+        Args:
+            y: Audio time series
+
+        Returns:
+            |STFT|^2 ((1 + n_fft/2) x time_frames)
+        """
+        return np.abs(librosa.stft(y, n_fft=self.n_fft, hop_length=self.hop_length, window=self.window)) ** 2
+
+    def log_mel_spectrogram(self, power_spectrum: np.ndarray, sr: int) -> np.ndarray:
+        """
+        Compute the dB-scaled Mel spectrogram shared by MFCC extraction and beat tracking
+
+        Same as librosa.power_to_db(librosa.feature.melspectrogram(y=...)),
+        which is also what librosa.beat.beat_track builds its onset envelope from.
+
+        Args:
+            power_spectrum: power_spectrogram(y)
+            sr: Sample rate
+
+        Returns:
+            Log-Mel spectrogram (n_mels x time_frames)
+        """
+        return librosa.power_to_db(self.get_mel_basis(sr) @ power_spectrum)
+
+    def extract_mfcc(self, y: np.ndarray, sr: int, power_spectrum: Optional[np.ndarray] = None,
+                     mfcc: Optional[np.ndarray] = None, log_mel: Optional[np.ndarray] = None) -> Dict:
         """
         Extract MFCC (Mel-Frequency Cepstral Coefficients) features
 
@@ -38,28 +343,33 @@ class AudioFeatureExtractor:
         Args:
             y: Audio time series
             sr: Sample rate
+            power_spectrum: Precomputed power_spectrogram(y), computed here if omitted
+            mfcc: Precomputed MFCC matrix (e.g. from TorchMFCCExtractor), only
+                the statistics are computed if given
+            log_mel: Precomputed log_mel_spectrogram(), computed here if omitted
 
         Returns:
             Dictionary containing MFCC data and statistics
         """
-        # Extract MFCC features
-        mfcc = librosa.feature.mfcc(
-            y=y,
-            sr=sr,
-            n_mfcc=self.n_mfcc,
-            n_fft=self.n_fft,
-            hop_length=self.hop_length
-        )
+        if mfcc is None:
+            if log_mel is None:
+                if power_spectrum is None:
+                    power_spectrum = self.power_spectrogram(y)
+                log_mel = self.log_mel_spectrogram(power_spectrum, sr)
+
+            # Extract MFCC features: power spectrogram -> cached Mel filter bank -> dB -> DCT
+            # (same steps as librosa.feature.mfcc(y=...), minus rebuilding the filter bank)
+            mfcc = scipy.fft.dct(log_mel, axis=0, type=2, norm='ortho')[:self.n_mfcc]
 
-        # Calculate statistics for each MFCC coefficient
-        mfcc_mean = np.mean(mfcc, axis=1)
-        mfcc_std = np.std(mfcc, axis=1)
-        mfcc_min = np.min(mfcc, axis=1)
-        mfcc_max = np.max(mfcc, axis=1)
+        # Calculate statistics for each MFCC coefficient in a single pass over the rows
+        mfcc = np.ascontiguousarray(mfcc, dtype=np.float32)
+        mfcc_mean, mfcc_std, mfcc_min, mfcc_max = _row_stats(mfcc)
 
         return {
-            'mfcc': mfcc.tolist(),  # Full MFCC matrix (n_mfcc x time_frames)
+            'mfcc': mfcc,  # Full MFCC matrix (n_mfcc x time_frames)
             'mfcc_mean': mfcc_mean.tolist(),
+            'mfcc_mean_unit': unit_vector(mfcc_mean).tolist(),  # For dot-product cosine
+            'mfcc_mean_norm': float(np.linalg.norm(mfcc_mean)),
             'mfcc_std': mfcc_std.tolist(),
             'mfcc_min': mfcc_min.tolist(),
             'mfcc_max': mfcc_max.tolist(),
@@ -69,7 +379,7 @@ class AudioFeatureExtractor:
             'hop_length': self.hop_length
         }
 
-    def extract_chroma(self, y: np.ndarray, sr: int) -> Dict:
+    def extract_chroma(self, y: np.ndarray, sr: int, power_spectrum: Optional[np.ndarray] = None) -> Dict:
         """
         Extract Chroma features (pitch class profiles)
 
@@ -79,28 +389,32 @@ class AudioFeatureExtractor:
         Args:
             y: Audio time series
             sr: Sample rate
+            power_spectrum: Precomputed power_spectrogram(y), computed here if omitted
 
         Returns:
             Dictionary containing Chroma data and statistics
         """
-        # Extract Chroma features
+        if power_spectrum is None:
+            power_spectrum = self.power_spectrogram(y)
+
+        # Extract Chroma features from the power spectrogram (what chroma_stft(y=...) computes first)
         chroma = librosa.feature.chroma_stft(
-            y=y,
+            S=power_spectrum,
             sr=sr,
             n_fft=self.n_fft,
             hop_length=self.hop_length,
             n_chroma=self.n_chroma
         )
 
-        # Calculate statistics for each pitch class
-        chroma_mean = np.mean(chroma, axis=1)
-        chroma_std = np.std(chroma, axis=1)
-        chroma_min = np.min(chroma, axis=1)
-        chroma_max = np.max(chroma, axis=1)
+        # Calculate statistics for each pitch class in a single pass over the rows
+        chroma = np.ascontiguousarray(chroma, dtype=np.float32)
+        chroma_mean, chroma_std, chroma_min, chroma_max = _row_stats(chroma)
 
         return {
-            'chroma': chroma.tolist(),  # Full Chroma matrix (12 x time_frames)
+            'chroma': chroma,  # Full Chroma matrix (12 x time_frames)
             'chroma_mean': chroma_mean.tolist(),
+            'chroma_mean_unit': unit_vector(chroma_mean).tolist(),  # For dot-product cosine
+            'chroma_mean_norm': float(np.linalg.norm(chroma_mean)),
             'chroma_std': chroma_std.tolist(),
             'chroma_min': chroma_min.tolist(),
             'chroma_max': chroma_max.tolist(),
@@ -109,41 +423,143 @@ class AudioFeatureExtractor:
             'pitch_classes': ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
         }
 
-    def extract_all_features(self, filepath: str) -> Tuple[Dict, float]:
+    def warmup(self, sr: int = 22050) -> None:
+        """
+        Run the extraction pipeline once on synthetic audio
+
+        librosa's STFT, tuning estimation and beat tracker are numba-jitted and
+        compile on first use, which otherwise adds seconds to the first real
+        extraction. Only runs once per extractor.
+
+        Args:
+            sr: Sample rate to warm up for
+        """
+        if self._warmed_up:
+            return
+
+        # Low-level noise rather than silence, so beat tracking runs its full path
+        y = (0.1 * np.random.default_rng(0).standard_normal(2 * sr)).astype(np.float32)
+        self.extract_all_features_from_array(y, sr, 'warmup')
+
+        self._warmed_up = True
+
+    def cache_path_for(self, filepath: str) -> str:
+        """
+        Feature cache entry for an audio file
+
+        The key covers the file (absolute path, mtime, size) and the extractor
+        configuration, so edits to either miss the cache instead of
+        returning stale features.
+
+        Args:
+            filepath: Path to audio file
+
+        Returns:
+            Path of the cached features JSON file inside cache_dir
+        """
+        stat = os.stat(filepath)
+        key = repr((
+            os.path.abspath(filepath), stat.st_mtime_ns, stat.st_size,
+            type(self).__name__, self.n_mfcc, self.n_fft, self.hop_length,
+            self.n_mels, self.n_chroma, FEATURE_CACHE_VERSION
+        ))
+        digest = hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+        return os.path.join(self.cache_dir, f'{digest}_features.json')
+
+    def extract_all_features(self, filepath: str, use_cache: bool = True) -> Tuple[Dict, float]:
         """
         Extract all features from an audio file
 
+        With a cache_dir, results are saved there like save_features output
+        and later calls for the unchanged file load them instead of
+        extracting again. Cached results are always returned as loaded back
+        from the cache (quantized matrices, 'shape' as a list), on a miss
+        too, so they don't depend on whether the entry already existed.
+
         Args:
             filepath: Path to audio file
+            use_cache: Read and fill the feature cache (if cache_dir is set)
+
+        Returns:
+            Tuple of (features dictionary, extraction time in seconds);
+            for a cache hit the time is that of the load
+        """
+        start_time = time.perf_counter()
+
+        cache_path = None
+        if use_cache and self.cache_dir is not None:
+            cache_path = self.cache_path_for(filepath)
+            features = load_feature_file(cache_path, mmap=True)
+            if features is not None:
+                return features, time.perf_counter() - start_time
+
+        # Load audio file (repeat extractions of the same file skip the decode)
+        y, sr = load_audio(filepath)
+
+        features, extraction_time = self.extract_all_features_from_array(
+            y, sr, os.path.basename(filepath), start_time=start_time
+        )
+
+        if cache_path is not None:
+            self.save_features(features, cache_path)
+            features = load_feature_file(cache_path, mmap=True)
+
+        return features, extraction_time
+
+    def extract_all_features_from_array(self, y: np.ndarray, sr: int, filename: str,
+                                        start_time: Optional[float] = None,
+                                        power_spectrum: Optional[np.ndarray] = None,
+                                        mfcc: Optional[np.ndarray] = None) -> Tuple[Dict, float]:
+        """
+        Extract all features from already decoded audio
+
+        Lets callers that have decoded the file anyway (e.g. for the waveform)
+        skip a second decode.
+
+        Args:
+            y: Mono audio time series
+            sr: Sample rate
+            filename: Name recorded in audio_info
+            start_time: time.perf_counter() to measure extraction time from (defaults to now)
+            power_spectrum: Precomputed power_spectrogram(y), computed here if omitted
+            mfcc: Precomputed MFCC matrix, computed here if omitted
 
         Returns:
             Tuple of (features dictionary, extraction time in seconds)
         """
-        start_time = time.time()
+        if start_time is None:
+            start_time = time.perf_counter()
 
-        # Load audio file
-        y, sr = librosa.load(filepath, sr=None, mono=True)
+        # Keep every downstream array in float32
+        y = np.ascontiguousarray(y, dtype=np.float32)
 
-        # Extract features
-        mfcc_features = self.extract_mfcc(y, sr)
-        chroma_features = self.extract_chroma(y, sr)
+        # Extract features from a single STFT
+        if power_spectrum is None:
+            power_spectrum = self.power_spectrogram(y)
+        log_mel = self.log_mel_spectrogram(power_spectrum, sr)
+        mfcc_features = self.extract_mfcc(y, sr, power_spectrum, mfcc, log_mel)
+        chroma_features = self.extract_chroma(y, sr, power_spectrum)
 
         # Get basic audio info
         duration = librosa.get_duration(y=y, sr=sr)
 
-        # Calculate tempo and beat frames
-        tempo, beat_frames = librosa.beat.beat_track(y=y, sr=sr)
+        # Calculate tempo and beat frames from the onset envelope of the same
+        # log-Mel spectrogram (what beat_track(y=...) would compute again)
+        onset_envelope = librosa.onset.onset_strength(S=log_mel, sr=sr, aggregate=np.median)
+        tempo, beat_frames = librosa.beat.beat_track(
+            onset_envelope=onset_envelope, sr=sr, hop_length=self.hop_length
+        )
 
-        extraction_time = time.time() - start_time
+        extraction_time = time.perf_counter() - start_time
 
         # Combine all features
         features = {
             'audio_info': {
-                'filename': os.path.basename(filepath),
+                'filename': filename,
                 'duration': float(duration),
                 'sample_rate': int(sr),
                 'num_samples': len(y),
-                'tempo': float(tempo),
+                'tempo': float(np.atleast_1d(tempo)[0]),
                 'num_beats': len(beat_frames)
             },
             'mfcc': mfcc_features,
@@ -153,9 +569,30 @@ class AudioFeatureExtractor:
 
         return features, extraction_time
 
+    def extract_batch(self, filepaths: List[str]) -> List[Tuple[Dict, float]]:
+        """
+        Extract all features from several audio files
+
+        The Mel filter banks, STFT window and numba kernels are set up once
+        and reused for every file.
+
+        Args:
+            filepaths: Paths to audio files
+
+        Returns:
+            List of (features dictionary, extraction time in seconds), one per file
+        """
+        self.warmup()
+        return [self.extract_all_features(filepath) for filepath in filepaths]
+
     def save_features(self, features: Dict, output_path: str) -> None:
         """
-        Save extracted features to JSON file
+        Save extracted features to a JSON sidecar plus one .npy file per matrix
+
+        The MFCC and Chroma matrices go into .npy files, quantized to
+        float16 and uint8 (see quantize_feature_array);
+        everything else (audio info, statistics, shapes) stays in the JSON
+        file, with the statistics computed at full precision.
 
         Args:
             features: Features dictionary
@@ -163,24 +600,198 @@ class AudioFeatureExtractor:
         """
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
-        with open(output_path, 'w') as f:
-            json.dump(features, f, indent=2)
-
-    def load_features(self, filepath: str) -> Optional[Dict]:
+        metadata = dict(features)
+        arrays = {}
+        for group, key in ARRAY_FEATURES:
+            metadata[group] = {k: v for k, v in features[group].items() if k != key}
+            arrays[group] = quantize_feature_array(group, np.asarray(features[group][key]))
+
+        # Write to temp files first so readers never see a partially written file.
+        # The JSON sidecar is written last as it marks the features as available.
+        for group, array in arrays.items():
+            array_path = array_path_for(output_path, group)
+            with open(array_path + '.tmp', 'wb') as f:
+                np.save(f, array)
+            os.replace(array_path + '.tmp', array_path)
+
+        # orjson serializes numpy scalars/arrays itself and is several times
+        # faster than the stdlib json module
+        tmp_path = output_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(orjson.dumps(metadata, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_INDENT_2))
+        os.replace(tmp_path, output_path)
+
+    def load_features(self, filepath: str, load_arrays: bool = True, mmap: bool = False) -> Optional[Dict]:
         """
-        Load previously extracted features from JSON file
+        Load previously extracted features
 
         Args:
             filepath: Path to JSON file
+            load_arrays: Also load the MFCC/Chroma matrices
+            mmap: Open the matrices memory-mapped (see load_feature_file)
 
         Returns:
             Features dictionary or None if file doesn't exist
         """
-        if not os.path.exists(filepath):
-            return None
+        return load_feature_file(filepath, load_arrays, mmap)
 
-        with open(filepath, 'r') as f:
-            return json.load(f)
+    def delete_features(self, filepath: str) -> None:
+        """
+        Delete a saved feature file and its matrices
+
+        Args:
+            filepath: Path to JSON file
+        """
+        array_paths = [array_path_for(filepath, group) for group, _ in ARRAY_FEATURES]
+        for path in [filepath] + array_paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def _default_torch_device() -> Optional[str]:
+    """
+    Get the device TorchMFCCExtractor runs on
+
+    Returns:
+        'cuda' if PyTorch is installed and a GPU is available, otherwise None
+    """
+    try:
+        import torch
+    except ImportError:
+        return None
+    return 'cuda' if torch.cuda.is_available() else None
+
+
+class TorchMFCCExtractor(AudioFeatureExtractor):
+    """
+    Feature extractor that computes spectrograms and MFCCs for batches of files on the GPU
+
+    Waveforms are zero-padded into one (batch x samples) tensor; the STFT,
+    Mel filter bank, dB scaling and DCT run on the GPU with the same window,
+    filter bank and DCT as the librosa path, and each file's frames are sliced
+    back out afterwards. Chroma and beat tracking still run on the CPU, from
+    the power spectrogram computed on the GPU.
+
+    PyTorch is optional: without it (or without CUDA) extract_batch falls
+    back to the librosa path of AudioFeatureExtractor.
+    """
+
+    def __init__(self, device: Optional[str] = None, batch_size: int = 16):
+        """
+        Initialize the extractor
+
+        Args:
+            device: Torch device to use (defaults to 'cuda' when available)
+            batch_size: Number of files stacked into one GPU batch
+        """
+        super().__init__()
+        self.device = device if device is not None else _default_torch_device()
+        self.batch_size = batch_size
+
+        # DCT-II (ortho) as a matrix, the transform applied by scipy.fft.dct
+        self._dct_matrix = scipy.fft.dct(np.eye(self.n_mels), axis=0, type=2, norm='ortho')[:self.n_mfcc]
+
+    def _spectrograms_and_mfccs(self, waveforms: List[np.ndarray], sr: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Compute power spectrograms and MFCCs for equal-rate waveforms in one GPU batch
+
+        Args:
+            waveforms: Mono float32 audio time series
+            sr: Their common sample rate
+
+        Returns:
+            List of (power spectrogram, MFCC matrix) per waveform
+        """
+        import torch
+
+        # Pad-stack into (batch, samples); zero padding matches the STFT's
+        # constant edge padding, so each file's own frames are unaffected
+        lengths = [len(y) for y in waveforms]
+        batch = np.zeros((len(waveforms), max(lengths)), dtype=np.float32)
+        for i, y in enumerate(waveforms):
+            batch[i, :len(y)] = y
+        batch = torch.from_numpy(batch).to(self.device)
+
+        window = torch.from_numpy(self.window.astype(np.float32)).to(self.device)
+        stft = torch.stft(batch, n_fft=self.n_fft, hop_length=self.hop_length, window=window,
+                          center=True, pad_mode='constant', return_complex=True)
+        power = stft.abs() ** 2  # (batch, 1 + n_fft/2, frames)
+
+        mel_basis = torch.from_numpy(self.get_mel_basis(sr)).to(self.device)
+        log_mel = 10.0 * torch.log10(torch.clamp(mel_basis @ power, min=1e-10))
+        # librosa.power_to_db's top_db=80, per file
+        log_mel = torch.maximum(log_mel, log_mel.amax(dim=(1, 2), keepdim=True) - 80.0)
+
+        dct_matrix = torch.from_numpy(self._dct_matrix.astype(np.float32)).to(self.device)
+        mfcc = (dct_matrix @ log_mel).cpu().numpy()
+        power = power.cpu().numpy()
+
+        results = []
+        for i, length in enumerate(lengths):
+            n_frames = 1 + length // self.hop_length
+            results.append((
+                np.ascontiguousarray(power[i, :, :n_frames]),
+                np.ascontiguousarray(mfcc[i, :, :n_frames])
+            ))
+        return results
+
+    def extract_batch(self, filepaths: List[str]) -> List[Tuple[Dict, float]]:
+        """
+        Extract all features from several audio files, batching the GPU work
+
+        Extraction times are measured from the start of each batch.
+
+        Args:
+            filepaths: Paths to audio files
+
+        Returns:
+            List of (features dictionary, extraction time in seconds), one per file
+        """
+        if self.device is None:
+            return super().extract_batch(filepaths)
+
+        self.warmup()
+        results = []
+        for batch_start in range(0, len(filepaths), self.batch_size):
+            batch_paths = filepaths[batch_start:batch_start + self.batch_size]
+            start_time = time.perf_counter()
+
+            loaded = []
+            for filepath in batch_paths:
+                y, sr = load_audio(filepath)
+                loaded.append((np.ascontiguousarray(y, dtype=np.float32), sr))
+
+            # One GPU batch per sample rate, since the Mel filter bank depends on it
+            spectral = [None] * len(loaded)
+            for sr in {sr for _, sr in loaded}:
+                indices = [i for i, (_, file_sr) in enumerate(loaded) if file_sr == sr]
+                batch_results = self._spectrograms_and_mfccs([loaded[i][0] for i in indices], sr)
+                for i, result in zip(indices, batch_results):
+                    spectral[i] = result
+
+            for filepath, (y, sr), (power_spectrum, mfcc) in zip(batch_paths, loaded, spectral):
+                results.append(self.extract_all_features_from_array(
+                    y, sr, os.path.basename(filepath), start_time=start_time,
+                    power_spectrum=power_spectrum, mfcc=mfcc
+                ))
+
+        return results
+
+
+def feature_path_for(audio_path: str, output_dir: str) -> str:
+    """
+    Get the features JSON path for an audio file
+
+    Args:
+        audio_path: Path to audio file
+        output_dir: Directory to save features
+
+    Returns:
+        <output_dir>/<audio name>_features.json
+    """
+    audio_filename = os.path.basename(audio_path)
+    feature_filename = os.path.splitext(audio_filename)[0] + '_features.json'
+    return os.path.join(output_dir, feature_filename)
 
 
 def extract_and_save_features(audio_path: str, output_dir: str = 'features') -> Dict:
@@ -198,9 +809,7 @@ def extract_and_save_features(audio_path: str, output_dir: str = 'features') ->
     features, extraction_time = extractor.extract_all_features(audio_path)
 
     # Create output filename based on audio filename
-    audio_filename = os.path.basename(audio_path)
-    feature_filename = os.path.splitext(audio_filename)[0] + '_features.json'
-    output_path = os.path.join(output_dir, feature_filename)
+    output_path = feature_path_for(audio_path, output_dir)
 
     extractor.save_features(features, output_path)
 
@@ -210,6 +819,82 @@ def extract_and_save_features(audio_path: str, output_dir: str = 'features') ->
     return features
 
 
+# AudioFeatureExtractor of an extract_corpus worker process
+_corpus_extractor = None
+
+
+def _init_corpus_worker() -> None:
+    """Set up an extract_corpus worker process"""
+    global _corpus_extractor
+
+    # One BLAS/OpenMP thread per worker, the pool already uses every core
+    if threadpool_limits is not None:
+        threadpool_limits(limits=1)
+    # threadpoolctl doesn't manage pyFFTW's threads (set by a caller that
+    # routed librosa's FFTs through it before forking the pool)
+    pyfftw = sys.modules.get('pyfftw')
+    if pyfftw is not None:
+        pyfftw.config.NUM_THREADS = 1
+
+    _corpus_extractor = AudioFeatureExtractor()
+    _corpus_extractor.warmup()
+
+
+def _extract_one(job: Tuple[str, str, Optional[Tuple[np.ndarray, int]]]) -> Tuple[str, float]:
+    """
+    Extract and save features for one file (runs in an extract_corpus worker)
+
+    Args:
+        job: Tuple of (audio path, output directory, already decoded
+            (y, sr) or None to load the file)
+
+    Returns:
+        Tuple of (features JSON path, extraction time in seconds)
+    """
+    audio_path, output_dir, audio = job
+    if audio is None:
+        features, extraction_time = _corpus_extractor.extract_all_features(audio_path)
+    else:
+        y, sr = audio
+        features, extraction_time = _corpus_extractor.extract_all_features_from_array(
+            y, sr, os.path.basename(audio_path)
+        )
+
+    output_path = feature_path_for(audio_path, output_dir)
+    _corpus_extractor.save_features(features, output_path)
+
+    return output_path, extraction_time
+
+
+def extract_corpus(audio_paths: List[str], output_dir: str = 'features',
+                   n_workers: Optional[int] = None,
+                   audio: Optional[List[Tuple[np.ndarray, int]]] = None) -> List[Tuple[str, float]]:
+    """
+    Extract and save features for many audio files in parallel processes
+
+    Each worker is limited to one BLAS thread (when threadpoolctl is
+    available) to avoid oversubscribing the cores. Scripts calling this
+    must guard their entry point with `if __name__ == '__main__'`.
+
+    Args:
+        audio_paths: Paths to audio files
+        output_dir: Directory to save features
+        n_workers: Number of worker processes (defaults to os.cpu_count())
+        audio: Already decoded (y, sr) for each path, e.g. audio that was
+            just synthesized, so the workers skip decoding the files
+
+    Returns:
+        List of (features JSON path, extraction time in seconds), in input order
+    """
+    n_workers = n_workers or os.cpu_count()
+    if audio is None:
+        audio = [None] * len(audio_paths)
+    jobs = [(audio_path, output_dir, decoded) for audio_path, decoded in zip(audio_paths, audio)]
+
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_corpus_worker) as executor:
+        return list(executor.map(_extract_one, jobs))
+
+
 if __name__ == '__main__':
     """
     Test the feature extractor with sample audio
@@ -0,0 +1,222 @@
+"""
+Shared test audio for the test scripts and pytest
+
+Each corpus is built at most once per process: test_features.py,
+test_similarity.py and the pytest session (see conftest.py) all get the
+same decoded audio and feature files instead of synthesizing and
+extracting them again.
+"""
+
+import functools
+import json
+import os
+from typing import List, Tuple
+
+import numba
+import numpy as np
+import soundfile as sf
+
+from feature_extractor import extract_corpus, load_audio
+
+
+# Paths are anchored at the backend folder, so the tests behave the same
+# whatever directory pytest or the scripts are started from
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+EXPERIMENTS_DIR = os.path.join(BACKEND_DIR, 'experiments')
+FEATURES_DIR = os.path.join(BACKEND_DIR, 'features')
+
+TEST_AUDIO = os.path.join(EXPERIMENTS_DIR, 'test_audio.wav')
+
+# Records the spec the test WAVs were generated with, so a changed spec
+# regenerates them instead of reusing stale files
+TEST_FILES_MANIFEST = os.path.join(EXPERIMENTS_DIR, '.testfiles.json')
+
+
+@numba.njit(cache=True)
+def _sine_bank(omegas, n):
+    """
+    sin(omega * k) for k = 0..n-1 and every omega, by phasor recurrence
+
+    Each sample is one complex multiply of the previous phasor instead of a
+    sin() call. The recurrence runs in complex128, where the drift after a few
+    seconds of samples (~1e-11) is far below 16-bit PCM resolution.
+
+    Args:
+        omegas: Phase step per sample of each sine (radians)
+        n: Number of samples
+
+    Returns:
+        float32 array (len(omegas) x n)
+    """
+    out = np.empty((omegas.shape[0], n), dtype=np.float32)
+    for r in range(omegas.shape[0]):
+        step = np.cos(omegas[r]) + 1j * np.sin(omegas[r])
+        phasor = 1.0 + 0.0j
+        for k in range(n):
+            out[r, k] = phasor.imag
+            phasor *= step
+    return out
+
+
+def _wav_matches_spec(filename, sr, duration):
+    """
+    Check that an existing WAV file has the expected sample rate and length
+
+    Args:
+        filename: Path to WAV file
+        sr: Expected sample rate
+        duration: Expected duration in seconds
+
+    Returns:
+        True if the file exists and matches
+    """
+    if not os.path.exists(filename):
+        return False
+    info = sf.info(filename)
+    return info.samplerate == sr and info.frames == int(sr * duration)
+
+
+def create_test_audio_files():
+    """
+    Create synthetic test audio files with different similarity levels
+
+    Files from an earlier run are reused when the manifest records the same
+    spec and every file still matches it.
+
+    Returns:
+        Tuple of (list of (filename, description) tuples, list of the written
+        (samples, sample rate) per file, or None if existing files were reused)
+    """
+    print("Creating test audio files...")
+
+    # Create experiments folder if it doesn't exist
+    os.makedirs(EXPERIMENTS_DIR, exist_ok=True)
+
+    test_files = [
+        (os.path.join(EXPERIMENTS_DIR, 'test_audio_440hz.wav'), "440 Hz sine wave (A note)"),
+        (os.path.join(EXPERIMENTS_DIR, 'test_audio_440hz_variation.wav'),
+         "440 Hz with modulation (similar to file 1)"),
+        (os.path.join(EXPERIMENTS_DIR, 'test_audio_550hz.wav'), "550 Hz sine wave (C# note - different)"),
+        (os.path.join(EXPERIMENTS_DIR, 'test_audio_chord.wav'), "A major chord (440, 554, 659 Hz)"),
+    ]
+
+    sr = 22050
+    duration = 3.0
+    # The 440 Hz A note, the 2 Hz modulation, 550 Hz (C#) and the
+    # 554/659 Hz notes of the chord
+    freqs = [440, 2, 550, 554, 659]
+
+    # Bump 'version' when the way the files are mixed below changes
+    spec = {'version': 2, 'sr': sr, 'duration': duration, 'freqs': freqs,
+            'files': [os.path.relpath(filename, BACKEND_DIR) for filename, _ in test_files]}
+    if os.path.exists(TEST_FILES_MANIFEST):
+        with open(TEST_FILES_MANIFEST) as f:
+            cached_spec = json.load(f)
+        if cached_spec == spec and all(_wav_matches_spec(filename, sr, duration)
+                                       for filename, _ in test_files):
+            print(f"Reusing {len(test_files)} existing test audio files")
+            return test_files, None
+
+    # All sine components in one pass, on the time grid of
+    # np.linspace(0, duration, n_samples)
+    n_samples = int(sr * duration)
+    time_step = duration / (n_samples - 1)
+    sines = _sine_bank(2 * np.pi * np.array(freqs, dtype=np.float64) * time_step, n_samples)
+    a4, modulation, c_sharp, chord_c_sharp, chord_e = sines
+
+    # File 1: Pure 440 Hz sine wave (A note)
+    y1 = 0.5 * a4
+
+    # File 2: Similar - 440 Hz with slight variation
+    y2 = y1 * (1 + 0.1 * modulation)
+
+    # File 3: Different frequency - 550 Hz (C# note)
+    y3 = 0.5 * c_sharp
+
+    # File 4: Complex tone - chord with multiple frequencies
+    y4 = 0.3 * (a4 + chord_c_sharp + chord_e)
+
+    audio = []
+    for (filename, _), y in zip(test_files, (y1, y2, y3, y4)):
+        # Quantize to 16-bit PCM ourselves (round to nearest, the same
+        # 1/32768 scale sf.read uses) so the files don't depend on
+        # libsndfile's float conversion
+        y_int = np.round(y * 32768).clip(-32768, 32767).astype(np.int16)
+        sf.write(filename, y_int, sr, subtype='PCM_16')
+
+        # Exactly what decoding the file gives, so features extracted from it
+        # match those of a later run that reuses the file
+        decoded = y_int.astype(np.float32) / 32768
+        reread, _ = sf.read(filename, dtype='float32')
+        assert np.array_equal(reread, decoded), f"PCM round trip mismatch: {filename}"
+        audio.append((decoded, sr))
+
+    with open(TEST_FILES_MANIFEST, 'w') as f:
+        json.dump(spec, f, indent=2)
+
+    print(f"Created {len(test_files)} test audio files")
+    return test_files, audio
+
+
+def extract_features_for_test_files(test_files, audio=None):
+    """
+    Extract features for all test files
+
+    Args:
+        test_files: List of (filename, description) tuples
+        audio: (samples, sample rate) per file if already in memory, so the
+            files aren't decoded again
+
+    Returns:
+        List of feature file paths
+    """
+    print("\nExtracting features for test files...")
+
+    # One worker process per file (up to the core count), see extract_corpus
+    n_workers = min(len(test_files), os.cpu_count() or 1)
+    results = extract_corpus([filename for filename, _ in test_files],
+                             output_dir=FEATURES_DIR, n_workers=n_workers, audio=audio)
+
+    feature_files = []
+    for (filename, description), (feature_filename, extraction_time) in zip(test_files, results):
+        print(f"  - {description}")
+        feature_files.append(feature_filename)
+        print(f"    Extracted in {extraction_time:.3f}s -> {feature_filename}")
+
+    return feature_files
+
+
+@functools.lru_cache(maxsize=None)
+def get_test_audio() -> Tuple[np.ndarray, int, str]:
+    """
+    Decode the benchmark audio file once
+
+    Returns:
+        Tuple of (read-only mono samples, sample rate, path)
+
+    Raises:
+        FileNotFoundError: If experiments/test_audio.wav is missing (it is
+            written by experiments/librosa_experiment.py)
+    """
+    if not os.path.exists(TEST_AUDIO):
+        raise FileNotFoundError(f"Test audio file not found: {TEST_AUDIO}")
+    y, sr = load_audio(TEST_AUDIO)
+    return y, sr, TEST_AUDIO
+
+
+@functools.lru_cache(maxsize=None)
+def get_similarity_corpus() -> Tuple[List[Tuple[str, str]], List[str]]:
+    """
+    Synthesize the similarity test WAVs and extract their features once
+
+    The WAVs themselves are also reused across runs, see
+    create_test_audio_files.
+
+    Returns:
+        Tuple of (list of (filename, description) tuples, list of feature
+        file paths in the same order)
+    """
+    os.makedirs(FEATURES_DIR, exist_ok=True)
+    test_files, audio = create_test_audio_files()
+    feature_files = extract_features_for_test_files(test_files, audio)
+    return test_files, feature_files
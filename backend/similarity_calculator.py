@@ -6,12 +6,76 @@ Implements DTW (Dynamic Time Warping) and Cosine Similarity algorithms
 for comparing audio feature vectors.
 """
 
+import heapq
+import math
+import numba
 import numpy as np
-from typing import Dict, Tuple, Optional
-import json
+from scipy.ndimage import maximum_filter1d, minimum_filter1d
+from typing import Dict, List, Tuple, Optional
 import os
-from scipy.spatial.distance import cosine as scipy_cosine
-from scipy.spatial.distance import euclidean
+from feature_extractor import load_feature_file, load_stats, unit_vector
+
+
+# fastmath without the no-NaN/no-Inf assumptions: the DTW matrix is seeded with inf
+DTW_FASTMATH = {'nsz', 'arcp', 'contract', 'afn', 'reassoc'}
+
+
+# Default Sakoe-Chiba band radius as a fraction of the longer sequence
+DTW_BAND_RATIO = 0.1
+
+
+@numba.njit(cache=True, fastmath=DTW_FASTMATH)
+def _dtw_core(a: np.ndarray, b: np.ndarray, radius: int) -> float:
+    """
+    DTW distance of two frame sequences within a Sakoe-Chiba band
+
+    Only cells with |i - j| <= radius are evaluated and only two rows of the
+    cost matrix are kept, so time and memory are O((n + m) * radius).
+
+    Args:
+        a: First sequence (n x k), C-contiguous float32
+        b: Second sequence (m x k), C-contiguous float32
+        radius: Band radius in frames (at least |n - m| so [n, m] is reachable)
+
+    Returns:
+        Accumulated cost at [n, m]
+    """
+    n, k = a.shape
+    m = b.shape[0]
+
+    # Row i - 1 and row i of the cost matrix
+    prev = np.full(m + 1, np.inf, dtype=np.float32)
+    curr = np.full(m + 1, np.inf, dtype=np.float32)
+    prev[0] = 0.0
+
+    for i in range(1, n + 1):
+        j0 = max(1, i - radius)
+        j1 = min(m + 1, i + radius + 1)
+
+        # Cells just outside the band must read as unreachable in the next row
+        curr[j0 - 1] = np.inf
+        for j in range(j0, j1):
+            # Euclidean distance between frames
+            d = 0.0
+            for f in range(k):
+                diff = a[i - 1, f] - b[j - 1, f]
+                d += diff * diff
+            cost = math.sqrt(d)
+
+            # Take minimum of insertion, deletion and match; written as
+            # selects so it compiles to min/cmov instead of data-dependent branches
+            up = prev[j]
+            left = curr[j - 1]
+            diag = prev[j - 1]
+            best = up if up < left else left
+            best = best if best < diag else diag
+            curr[j] = cost + best
+        if j1 <= m:
+            curr[j1] = np.inf
+
+        prev, curr = curr, prev
+
+    return prev[m]
 
 
 class SimilarityCalculator:
@@ -19,11 +83,88 @@ class SimilarityCalculator:
     Calculate similarity between audio features using various algorithms
     """
 
-    def __init__(self):
-        """Initialize similarity calculator"""
-        pass
+    def __init__(self, dtw_band_ratio: Optional[float] = DTW_BAND_RATIO):
+        """
+        Initialize similarity calculator
+
+        Args:
+            dtw_band_ratio: Sakoe-Chiba band radius for DTW as a fraction of the
+                longer sequence (None for unconstrained DTW)
+        """
+        self.dtw_band_ratio = dtw_band_ratio
+
+    def _as_frames(self, seq: np.ndarray) -> np.ndarray:
+        """
+        View a feature sequence as (time_frames x n_features)
+
+        Args:
+            seq: Feature sequence in either orientation, or a 1-D sequence
+
+        Returns:
+            2-D array with one row per frame
+        """
+        # Ensure sequences are 2D arrays (lists from legacy JSON features included)
+        seq = np.asarray(seq)
+        if seq.ndim == 1:
+            seq = seq.reshape(-1, 1)
+
+        # Transpose if features are in rows instead of columns
+        if seq.shape[0] < seq.shape[1]:
+            seq = seq.T
+        return seq
+
+    def _band_radius(self, n: int, m: int) -> int:
+        """
+        DTW band radius for sequences of n and m frames
+
+        Widened to |n - m| so the end of both sequences is reachable.
+        """
+        if self.dtw_band_ratio is None:
+            return max(n, m)
+        return max(int(self.dtw_band_ratio * max(n, m)), abs(n - m))
+
+    def prepare_features(self, features: Dict) -> Dict:
+        """
+        Precompute the per-file inputs of pairwise comparisons
+
+        Adds '<group>_frames', the feature matrix as C-contiguous float32
+        frames (time_frames x n_features), which dtw_distance would otherwise
+        transpose and copy again in every comparison, and the mean vector
+        norm for files saved before norms were stored. Worth it when a file
+        is compared against several others.
+
+        Args:
+            features: Features dictionary (as loaded by load_feature_file)
+
+        Returns:
+            The same dictionary, updated in place
+        """
+        for group in ('mfcc', 'chroma'):
+            data = features[group]
+            data[f'{group}_frames'] = np.ascontiguousarray(self._as_frames(data[group]),
+                                                           dtype=np.float32)
+            if data.get(f'{group}_mean_norm') is None:
+                data[f'{group}_mean_norm'] = float(np.linalg.norm(np.asarray(data[f'{group}_mean'])))
+        return features
+
+    def feature_sequence(self, features: Dict, group: str) -> np.ndarray:
+        """
+        Get a file's feature sequence for DTW
+
+        Args:
+            features: Features dictionary
+            group: Feature group ('mfcc' or 'chroma')
 
-    def dtw_distance(self, seq1: np.ndarray, seq2: np.ndarray) -> Tuple[float, np.ndarray]:
+        Returns:
+            The frames from prepare_features if present, otherwise the matrix
+            (float32 arrays dequantized from the .npy files)
+        """
+        frames = features[group].get(f'{group}_frames')
+        if frames is not None:
+            return frames
+        return np.asarray(features[group][group])
+
+    def dtw_distance(self, seq1: np.ndarray, seq2: np.ndarray) -> Tuple[float, None]:
         """
         Calculate Dynamic Time Warping (DTW) distance between two sequences
 
@@ -36,46 +177,99 @@ class SimilarityCalculator:
             seq2: Second sequence (n_features x time_frames_2)
 
         Returns:
-            Tuple of (dtw_distance, cost_matrix)
+            Tuple of (dtw_distance, None); the cost matrix is no longer kept
         """
-        # Ensure sequences are 2D arrays
-        if seq1.ndim == 1:
-            seq1 = seq1.reshape(-1, 1)
-        if seq2.ndim == 1:
-            seq2 = seq2.reshape(-1, 1)
+        seq1 = self._as_frames(seq1)
+        seq2 = self._as_frames(seq2)
+        n, m = len(seq1), len(seq2)
+        radius = self._band_radius(n, m)
 
-        # Transpose if features are in rows instead of columns
-        if seq1.shape[0] < seq1.shape[1]:
-            seq1 = seq1.T
-        if seq2.shape[0] < seq2.shape[1]:
-            seq2 = seq2.T
+        # Banded DP with the compiled kernel. The transposes are F-ordered
+        # views; give the kernel C-contiguous float32 frames so it always
+        # runs its one compiled specialization
+        seq1 = np.ascontiguousarray(seq1, dtype=np.float32)
+        seq2 = np.ascontiguousarray(seq2, dtype=np.float32)
+        dtw_distance = float(_dtw_core(seq1, seq2, radius))
 
-        n, m = len(seq1), len(seq2)
+        # Normalize by the sum of sequence lengths to make it comparable
+        normalized_distance = dtw_distance / (n + m)
 
-        # Initialize cost matrix with infinity
-        dtw_matrix = np.full((n + 1, m + 1), np.inf)
-        dtw_matrix[0, 0] = 0
+        return normalized_distance, None
 
-        # Fill the DTW matrix using dynamic programming
-        for i in range(1, n + 1):
-            for j in range(1, m + 1):
-                # Calculate Euclidean distance between frames
-                cost = euclidean(seq1[i - 1], seq2[j - 1])
+    def lb_keogh(self, seq1: np.ndarray, seq2: np.ndarray) -> float:
+        """
+        LB_Keogh lower bound of dtw_distance(seq1, seq2)
 
-                # Take minimum of three possible paths
-                dtw_matrix[i, j] = cost + min(
-                    dtw_matrix[i - 1, j],      # insertion
-                    dtw_matrix[i, j - 1],      # deletion
-                    dtw_matrix[i - 1, j - 1]   # match
-                )
+        Every warping path pairs each frame of seq1 with at least one frame of
+        seq2 inside the band. The distance from the seq1 frame to the
+        bounding box (envelope) of those seq2 frames is no larger than any
+        such pairing's cost, so summing it over seq1 bounds the DTW cost from
+        below at O(n) cost instead of O(n * band).
 
-        # The DTW distance is in the bottom-right corner
-        dtw_distance = dtw_matrix[n, m]
+        Args:
+            seq1: First sequence (n_features x time_frames_1)
+            seq2: Second sequence (n_features x time_frames_2)
 
-        # Normalize by the sum of sequence lengths to make it comparable
-        normalized_distance = dtw_distance / (n + m)
+        Returns:
+            Lower bound on the normalized DTW distance
+        """
+        query = self._as_frames(seq1)
+        candidate = self._as_frames(seq2)
+        n, m = len(query), len(candidate)
+        size = 2 * min(self._band_radius(n, m), max(n, m)) + 1
+
+        # Per-frame envelope of seq2 over the band; seq2 is padded to n frames
+        # with values that never win, for query frames past its end
+        pad = ((0, max(0, n - m)), (0, 0))
+        upper = maximum_filter1d(np.pad(candidate, pad, constant_values=-np.inf),
+                                 size, axis=0, mode='nearest')[:n]
+        lower = minimum_filter1d(np.pad(candidate, pad, constant_values=np.inf),
+                                 size, axis=0, mode='nearest')[:n]
+
+        excess = np.maximum(query - upper, 0) + np.maximum(lower - query, 0)
+        bound = float(np.sqrt(np.einsum('ij,ij->i', excess, excess)).sum())
+
+        return bound / (n + m)
+
+    def search(self, query_features: Dict, corpus_features: List[Dict], top_k: int = 5,
+               group: str = 'mfcc') -> List[Tuple[int, float]]:
+        """
+        Find the corpus files closest to a query by DTW distance
+
+        Candidates are visited in order of their LB_Keogh bound and DTW only
+        runs while the bound is below the current k-th best distance; after
+        that no remaining candidate can make the top k.
 
-        return normalized_distance, dtw_matrix
+        Args:
+            query_features: Features dictionary of the query file
+            corpus_features: Features dictionaries to search
+            top_k: Number of results
+            group: Feature group to align ('mfcc' or 'chroma')
+
+        Returns:
+            List of (corpus index, normalized DTW distance), closest first
+        """
+        query = self._as_frames(self.feature_sequence(query_features, group))
+
+        candidates = []
+        for index, features in enumerate(corpus_features):
+            candidate = self._as_frames(self.feature_sequence(features, group))
+            candidates.append((self.lb_keogh(query, candidate), index, candidate))
+        candidates.sort(key=lambda item: item[0])
+
+        # Max-heap of the best distances so far, as (-distance, index)
+        best = []
+        for bound, index, candidate in candidates:
+            if len(best) == top_k and bound >= -best[0][0]:
+                break
+            distance, _ = self.dtw_distance(query, candidate)
+            if len(best) < top_k:
+                heapq.heappush(best, (-distance, index))
+            elif distance < -best[0][0]:
+                heapq.heapreplace(best, (-distance, index))
+
+        return sorted(((index, -neg_distance) for neg_distance, index in best),
+                      key=lambda result: result[1])
 
     def cosine_similarity(self, vec1: np.ndarray, vec2: np.ndarray) -> float:
         """
@@ -92,9 +286,9 @@ class SimilarityCalculator:
         Returns:
             Cosine similarity score (0 to 1, where 1 is most similar)
         """
-        # Flatten arrays if needed
-        vec1 = np.array(vec1).flatten()
-        vec2 = np.array(vec2).flatten()
+        # Flatten to contiguous float32 (a view, not a copy, for float32 arrays)
+        vec1 = np.ascontiguousarray(vec1, dtype=np.float32).ravel()
+        vec2 = np.ascontiguousarray(vec2, dtype=np.float32).ravel()
 
         # Handle edge case where vectors have different lengths
         if len(vec1) != len(vec2):
@@ -102,11 +296,62 @@ class SimilarityCalculator:
             vec1 = vec1[:min_len]
             vec2 = vec2[:min_len]
 
-        # Calculate cosine similarity (1 - cosine distance)
-        # scipy's cosine returns distance, so we convert to similarity
-        similarity = 1 - scipy_cosine(vec1, vec2)
+        # Calculate cosine similarity with BLAS dot products
+        numerator = float(vec1 @ vec2)
+        denominator = float(np.linalg.norm(vec1) * np.linalg.norm(vec2))
+
+        return numerator / denominator if denominator else 0.0
+
+    def cosine_similarity_precomputed(self, vec1: np.ndarray, vec2: np.ndarray,
+                                      norm1: float, norm2: float) -> float:
+        """
+        Calculate cosine similarity between two vectors whose norms are known
+
+        Same as cosine_similarity, minus recomputing both norms on every call.
+
+        Args:
+            vec1: First feature vector
+            vec2: Second feature vector
+            norm1: Euclidean norm of vec1
+            norm2: Euclidean norm of vec2
+
+        Returns:
+            Cosine similarity score
+        """
+        denominator = norm1 * norm2
+        if not denominator:
+            return 0.0
+        return float(np.dot(vec1, vec2)) / denominator
+
+    def cosine_similarity_matrix(self, matrix1: np.ndarray, matrix2: np.ndarray) -> np.ndarray:
+        """
+        Calculate cosine similarity between every pair of rows of two matrices
+
+        One matrix product instead of a cosine_similarity call per pair.
+
+        Args:
+            matrix1: First set of feature vectors (n_vectors_1 x n_features)
+            matrix2: Second set of feature vectors (n_vectors_2 x n_features)
+
+        Returns:
+            Similarity matrix (n_vectors_1 x n_vectors_2); rows that are all
+            zeros get a similarity of 0
+        """
+        matrix1 = np.atleast_2d(np.asarray(matrix1))
+        matrix2 = np.atleast_2d(np.asarray(matrix2))
+        dtype = np.result_type(matrix1, matrix2, np.float32)
+        matrix1 = matrix1.astype(dtype, copy=False)
+        matrix2 = matrix2.astype(dtype, copy=False)
+
+        norms1 = np.linalg.norm(matrix1, axis=1)
+        norms2 = np.linalg.norm(matrix2, axis=1)
+        denominator = np.outer(norms1, norms2)
+
+        similarity = matrix1 @ matrix2.T
+        np.divide(similarity, denominator, out=similarity, where=denominator != 0)
+        similarity[denominator == 0] = 0.0
 
-        return float(similarity)
+        return similarity
 
     def euclidean_distance(self, vec1: np.ndarray, vec2: np.ndarray) -> float:
         """
@@ -119,15 +364,110 @@ class SimilarityCalculator:
         Returns:
             Euclidean distance (lower is more similar)
         """
-        vec1 = np.array(vec1).flatten()
-        vec2 = np.array(vec2).flatten()
+        vec1 = np.ascontiguousarray(vec1, dtype=np.float32).ravel()
+        vec2 = np.ascontiguousarray(vec2, dtype=np.float32).ravel()
 
         if len(vec1) != len(vec2):
             min_len = min(len(vec1), len(vec2))
             vec1 = vec1[:min_len]
             vec2 = vec2[:min_len]
 
-        return float(euclidean(vec1, vec2))
+        return float(np.linalg.norm(vec1 - vec2))
+
+    def mean_cosine_similarity(self, features1: Dict, features2: Dict, group: str) -> float:
+        """
+        Cosine similarity of two files' mean feature vectors
+
+        Uses the unit-length mean vectors stored at extraction time, so this
+        is a single dot product.
+
+        Args:
+            features1: First audio's features dictionary
+            features2: Second audio's features dictionary
+            group: Feature group ('mfcc' or 'chroma')
+
+        Returns:
+            Cosine similarity score
+        """
+        return float(np.dot(self.mean_unit_vector(features1, group),
+                            self.mean_unit_vector(features2, group)))
+
+    def mean_unit_vector(self, features: Dict, group: str) -> np.ndarray:
+        """
+        Get a file's unit-length mean feature vector
+
+        Args:
+            features: Features dictionary
+            group: Feature group ('mfcc' or 'chroma')
+
+        Returns:
+            The vector saved at extraction time, or the normalized mean for
+            feature files saved before it existed
+        """
+        unit_key = f'{group}_mean_unit'
+        if unit_key in features[group]:
+            return np.asarray(features[group][unit_key], dtype=np.float32)
+        return unit_vector(features[group][f'{group}_mean'])
+
+    def mean_vector(self, features: Dict, group: str) -> Tuple[np.ndarray, float]:
+        """
+        Get a file's mean feature vector and its norm
+
+        Args:
+            features: Features dictionary
+            group: Feature group ('mfcc' or 'chroma')
+
+        Returns:
+            Tuple of (mean vector, its Euclidean norm); the norm saved at
+            extraction time is used when present
+        """
+        mean = np.asarray(features[group][f'{group}_mean'])
+        norm = features[group].get(f'{group}_mean_norm')
+        if norm is None:
+            norm = float(np.linalg.norm(mean))
+        return mean, norm
+
+    def mean_similarity_matrix(self, features_list: List[Dict], group: str) -> np.ndarray:
+        """
+        Cosine similarity of the mean feature vectors of every pair of files
+
+        The unit-length mean vectors are stacked into one (n_files x n_features)
+        matrix, so the whole matrix is a single matrix product.
+
+        Args:
+            features_list: Features dictionaries of the files to compare
+            group: Feature group ('mfcc' or 'chroma')
+
+        Returns:
+            Similarity matrix (n_files x n_files)
+        """
+        units = np.stack([self.mean_unit_vector(features, group) for features in features_list])
+        return units @ units.T
+
+    def quick_similarity(self, features1: Dict, features2: Dict) -> Dict:
+        """
+        Compare two audio files using only their mean MFCC and Chroma vectors
+
+        Skips DTW over the full sequences, so the feature matrices don't need
+        to be loaded at all.
+
+        Args:
+            features1: First audio's features dictionary
+            features2: Second audio's features dictionary
+
+        Returns:
+            Dictionary with MFCC/Chroma cosine similarities and a combined score (0-100%)
+        """
+        mfcc_cosine = self.mean_cosine_similarity(features1, features2, 'mfcc')
+        chroma_cosine = self.mean_cosine_similarity(features1, features2, 'chroma')
+
+        return {
+            'overall_similarity': float((mfcc_cosine * 0.6 + chroma_cosine * 0.4) * 100),
+            'mfcc_cosine_similarity': mfcc_cosine,
+            'chroma_cosine_similarity': chroma_cosine,
+            'audio1_info': features1['audio_info'],
+            'audio2_info': features2['audio_info']
+        }
 
     def compare_mfcc_features(self, features1: Dict, features2: Dict) -> Dict:
         """
@@ -141,18 +481,18 @@ class SimilarityCalculator:
             Dictionary with comparison results
         """
         # Extract MFCC data
-        mfcc1 = np.array(features1['mfcc']['mfcc'])
-        mfcc2 = np.array(features2['mfcc']['mfcc'])
+        mfcc1 = self.feature_sequence(features1, 'mfcc')
+        mfcc2 = self.feature_sequence(features2, 'mfcc')
 
-        # Extract MFCC statistics for cosine similarity
-        mfcc1_mean = np.array(features1['mfcc']['mfcc_mean'])
-        mfcc2_mean = np.array(features2['mfcc']['mfcc_mean'])
+        # Extract MFCC statistics (norms saved at extraction time)
+        mfcc1_mean, mfcc1_norm = self.mean_vector(features1, 'mfcc')
+        mfcc2_mean, mfcc2_norm = self.mean_vector(features2, 'mfcc')
 
         # Calculate DTW distance on full MFCC sequences
         dtw_dist, _ = self.dtw_distance(mfcc1, mfcc2)
 
         # Calculate cosine similarity on MFCC means
-        cosine_sim = self.cosine_similarity(mfcc1_mean, mfcc2_mean)
+        cosine_sim = self.cosine_similarity_precomputed(mfcc1_mean, mfcc2_mean, mfcc1_norm, mfcc2_norm)
 
         # Calculate Euclidean distance on MFCC means
         euclidean_dist = self.euclidean_distance(mfcc1_mean, mfcc2_mean)
@@ -177,18 +517,18 @@ class SimilarityCalculator:
             Dictionary with comparison results
         """
         # Extract Chroma data
-        chroma1 = np.array(features1['chroma']['chroma'])
-        chroma2 = np.array(features2['chroma']['chroma'])
+        chroma1 = self.feature_sequence(features1, 'chroma')
+        chroma2 = self.feature_sequence(features2, 'chroma')
 
-        # Extract Chroma statistics for cosine similarity
-        chroma1_mean = np.array(features1['chroma']['chroma_mean'])
-        chroma2_mean = np.array(features2['chroma']['chroma_mean'])
+        # Extract Chroma statistics (norms saved at extraction time)
+        chroma1_mean, chroma1_norm = self.mean_vector(features1, 'chroma')
+        chroma2_mean, chroma2_norm = self.mean_vector(features2, 'chroma')
 
         # Calculate DTW distance on full Chroma sequences
         dtw_dist, _ = self.dtw_distance(chroma1, chroma2)
 
         # Calculate cosine similarity on Chroma means
-        cosine_sim = self.cosine_similarity(chroma1_mean, chroma2_mean)
+        cosine_sim = self.cosine_similarity_precomputed(chroma1_mean, chroma2_mean, chroma1_norm, chroma2_norm)
 
         # Calculate Euclidean distance on Chroma means
         euclidean_dist = self.euclidean_distance(chroma1_mean, chroma2_mean)
@@ -261,18 +601,33 @@ class SimilarityCalculator:
         Returns:
             Dictionary with comparison results
         """
-        # Load features
-        with open(feature_file1, 'r') as f:
-            features1 = json.load(f)
-
-        with open(feature_file2, 'r') as f:
-            features2 = json.load(f)
+        # Load features (matrices dequantized to float32)
+        features1 = load_feature_file(feature_file1, mmap=True)
+        features2 = load_feature_file(feature_file2, mmap=True)
 
         # Calculate similarity
         results = self.calculate_overall_similarity(features1, features2)
 
         return results
 
+    def quick_compare_audio_files(self, feature_file1: str, feature_file2: str) -> Dict:
+        """
+        Compare two audio files by their mean feature vectors only
+
+        Only the JSON sidecars are read; see quick_similarity.
+
+        Args:
+            feature_file1: Path to first feature JSON file
+            feature_file2: Path to second feature JSON file
+
+        Returns:
+            Dictionary with comparison results
+        """
+        features1 = load_stats(feature_file1)
+        features2 = load_stats(feature_file2)
+
+        return self.quick_similarity(features1, features2)
+
 
 def compare_features(feature_file1: str, feature_file2: str) -> Dict:
     """
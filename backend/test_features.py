@@ -5,16 +5,72 @@ Week 24/11/25 Milestone
 Tests the feature extraction module for accuracy and performance
 """
 
+import contextlib
 import os
+import shutil
+import statistics
 import sys
+import tempfile
 import time
-import json
-from feature_extractor import AudioFeatureExtractor, extract_and_save_features
 
+from fixtures import FEATURES_DIR, TEST_AUDIO, get_test_audio
 
-def test_feature_extraction():
+import librosa
+import numpy as np
+from feature_extractor import (AudioFeatureExtractor, array_path_for,
+                               extract_corpus, ARRAY_FEATURES)
+
+try:
+    import pyfftw.interfaces.cache
+    import pyfftw.interfaces.numpy_fft
+except ImportError:  # optional, librosa keeps its default FFT without it
+    pyfftw = None
+
+# Worker processes used by the parallel throughput test (Test 7)
+PARALLEL_TEST_MAX_WORKERS = 4
+
+
+@contextlib.contextmanager
+def fftw_backend():
+    """
+    Route librosa's FFTs through multithreaded pyFFTW inside the block
+
+    FFTW plans are kept between calls, so the benchmark iterations reuse the
+    plans of the warmup run instead of planning again. librosa's previous FFT
+    library and pyFFTW's settings are restored on exit; without pyFFTW this
+    does nothing.
+
+    Yields:
+        Name of the FFT library in use
+    """
+    if pyfftw is None:
+        yield librosa.get_fftlib().__name__
+        return
+
+    previous_fftlib = librosa.get_fftlib()
+    previous_threads = pyfftw.config.NUM_THREADS
+    pyfftw.config.NUM_THREADS = os.cpu_count()
+    pyfftw.interfaces.cache.enable()
+    pyfftw.interfaces.cache.set_keepalive_time(60)
+    librosa.set_fftlib(pyfftw.interfaces.numpy_fft)
+    try:
+        yield 'pyFFTW (plan cache on)'
+    finally:
+        librosa.set_fftlib(previous_fftlib)
+        pyfftw.interfaces.cache.disable()
+        pyfftw.config.NUM_THREADS = previous_threads
+
+
+def run_feature_extraction_tests(strict=False):
     """
     Test feature extraction on sample audio files
+
+    Args:
+        strict: Re-raise the first failure instead of reporting it and
+            returning False (used under pytest)
+
+    Returns:
+        True if every check passed
     """
     print("=" * 60)
     print("Feature Extraction Performance Test")
@@ -25,11 +81,13 @@ def test_feature_extraction():
     extractor = AudioFeatureExtractor()
 
     # Test audio file
-    test_audio = 'experiments/test_audio.wav'
+    test_audio = TEST_AUDIO
 
     if not os.path.exists(test_audio):
         print(f"\n❌ Test audio file not found: {test_audio}")
         print("Please ensure the file exists from Week 10/11/25 milestone")
+        if strict:
+            raise FileNotFoundError(test_audio)
         return False
 
     print(f"\n📁 Test file: {test_audio}")
@@ -38,9 +96,9 @@ def test_feature_extraction():
     # Test 1: Feature Extraction
     print("\n[Test 1] Feature Extraction")
     try:
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
         features, extraction_time = extractor.extract_all_features(test_audio)
-        total_time = time.time() - start_time
+        total_time = (time.perf_counter_ns() - start_ns) / 1e9
 
         print(f"  ✅ Extraction successful")
         print(f"  ⏱️  Extraction time: {extraction_time:.3f}s")
@@ -54,6 +112,8 @@ def test_feature_extraction():
 
     except Exception as e:
         print(f"  ❌ Extraction failed: {str(e)}")
+        if strict:
+            raise
         return False
 
     # Test 2: MFCC Features Validation
@@ -69,11 +129,20 @@ def test_feature_extraction():
         assert len(mfcc['mfcc_mean']) == 13, "MFCC mean length mismatch"
         assert len(mfcc['mfcc_std']) == 13, "MFCC std length mismatch"
 
+        # The shared-STFT MFCCs must match librosa's own (separate STFT) path
+        y, sr, _ = get_test_audio()
+        reference = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=extractor.n_mfcc,
+                                         n_fft=extractor.n_fft, hop_length=extractor.hop_length)
+        error = np.abs(mfcc['mfcc'] - reference).max() / np.abs(reference).max()
+        assert error <= 1e-5, f"MFCC differs from librosa.feature.mfcc (relative error {error:.2e})"
+
         print(f"  ✅ MFCC validation passed")
         print(f"  First 3 MFCC means: {[f'{x:.2f}' for x in mfcc['mfcc_mean'][:3]]}")
 
     except Exception as e:
         print(f"  ❌ MFCC validation failed: {str(e)}")
+        if strict:
+            raise
         return False
 
     # Test 3: Chroma Features Validation
@@ -89,16 +158,23 @@ def test_feature_extraction():
         assert len(chroma['chroma_mean']) == 12, "Chroma mean length mismatch"
         assert len(chroma['pitch_classes']) == 12, "Pitch classes mismatch"
 
+        reference = librosa.feature.chroma_stft(y=y, sr=sr, n_fft=extractor.n_fft,
+                                                hop_length=extractor.hop_length)
+        assert np.abs(chroma['chroma'] - reference).max() <= 1e-5, \
+            "Chroma differs from librosa.feature.chroma_stft"
+
         print(f"  ✅ Chroma validation passed")
         print(f"  Pitch classes: {', '.join(chroma['pitch_classes'])}")
 
         # Show dominant pitch
-        max_idx = chroma['chroma_mean'].index(max(chroma['chroma_mean']))
+        max_idx = int(np.argmax(chroma['chroma_mean']))
         dominant_pitch = chroma['pitch_classes'][max_idx]
         print(f"  Dominant pitch: {dominant_pitch}")
 
     except Exception as e:
         print(f"  ❌ Chroma validation failed: {str(e)}")
+        if strict:
+            raise
         return False
 
     # Test 4: Audio Info Validation
@@ -123,13 +199,15 @@ def test_feature_extraction():
 
     except Exception as e:
         print(f"  ❌ Audio info validation failed: {str(e)}")
+        if strict:
+            raise
         return False
 
     # Test 5: Save and Load Features
     print("\n[Test 5] Save/Load Features")
     try:
-        test_feature_path = 'features/test_features.json'
-        os.makedirs('features', exist_ok=True)
+        test_feature_path = os.path.join(FEATURES_DIR, 'test_features.json')
+        os.makedirs(FEATURES_DIR, exist_ok=True)
 
         # Save features
         extractor.save_features(features, test_feature_path)
@@ -140,45 +218,123 @@ def test_feature_extraction():
         assert loaded_features is not None, "Failed to load features"
         assert loaded_features['audio_info']['duration'] == features['audio_info']['duration'], \
             "Loaded features don't match"
+        assert loaded_features['mfcc']['mfcc'].shape == tuple(features['mfcc']['shape']), \
+            "Loaded MFCC matrix doesn't match"
 
         print(f"  ✅ Features loaded and verified")
 
-        # Check file size
-        file_size = os.path.getsize(test_feature_path)
+        # Check file size (JSON sidecar + .npy matrices)
+        file_size = (os.path.getsize(test_feature_path) +
+                     os.path.getsize(array_path_for(test_feature_path, 'mfcc')) +
+                     os.path.getsize(array_path_for(test_feature_path, 'chroma')))
         print(f"  Feature file size: {file_size / 1024:.1f} KB")
 
     except Exception as e:
         print(f"  ❌ Save/Load test failed: {str(e)}")
+        if strict:
+            raise
         return False
 
     # Test 6: Performance Benchmark
     print("\n[Test 6] Performance Benchmark")
-    print("  Running 5 iterations...")
     try:
-        times = []
-        for i in range(5):
-            start = time.time()
-            _, extraction_time = extractor.extract_all_features(test_audio)
-            times.append(extraction_time)
-            print(f"    Iteration {i+1}: {extraction_time:.3f}s")
-
-        avg_time = sum(times) / len(times)
+        with fftw_backend() as fft_backend:
+            print(f"  FFT backend: {fft_backend}")
+            print("  Running 5 iterations...")
+
+            # Untimed warmup: librosa's numba kernels (beat tracking etc.) and ours
+            # compile on first use, which would otherwise land in iteration 1
+            extractor.extract_all_features(test_audio)
+
+            times = []
+            for i in range(5):
+                start_ns = time.perf_counter_ns()
+                extractor.extract_all_features(test_audio)
+                elapsed = (time.perf_counter_ns() - start_ns) / 1e9
+                times.append(elapsed)
+                print(f"    Iteration {i+1}: {elapsed:.3f}s")
+
+        # Median and p95 rather than the mean, so one slow run shows up as tail
+        # latency instead of skewing the typical time
+        median_time = statistics.median(times)
+        p95_time = statistics.quantiles(times, n=20, method='inclusive')[-1]
         min_time = min(times)
         max_time = max(times)
 
         print(f"\n  📊 Performance Statistics:")
-        print(f"    Average: {avg_time:.3f}s")
+        print(f"    Median: {median_time:.3f}s")
+        print(f"    p95: {p95_time:.3f}s")
         print(f"    Min: {min_time:.3f}s")
         print(f"    Max: {max_time:.3f}s")
 
         # Check if within performance target (< 5 seconds for 5 second audio)
-        if avg_time < 5.0:
+        if median_time < 5.0:
             print(f"  ✅ Performance target met (< 5s)")
         else:
             print(f"  ⚠️  Performance slower than target (> 5s)")
 
+        # Same file through the feature cache: one cold extraction fills it,
+        # the warm iterations only load the saved features
+        cached_extractor = AudioFeatureExtractor(cache_dir=os.path.join(FEATURES_DIR, '.cache'))
+        cache_path = cached_extractor.cache_path_for(test_audio)
+        cached_extractor.delete_features(cache_path)
+
+        cold, cold_time = cached_extractor.extract_all_features(test_audio)
+        warm_times = []
+        for i in range(5):
+            cached, warm_time = cached_extractor.extract_all_features(test_audio)
+            warm_times.append(warm_time)
+
+        # A miss returns the same (stored) representation as a hit
+        assert cached['mfcc']['shape'] == cold['mfcc']['shape'], "Cached MFCC shape mismatch"
+        for group, key in ARRAY_FEATURES:
+            assert np.array_equal(cached[group][key], cold[group][key]), f"Cached {group} matrix mismatch"
+        assert cached['mfcc']['mfcc'].shape == mfcc['mfcc'].shape, "Cached MFCC matrix shape mismatch"
+
+        print(f"\n  📊 Feature Cache:")
+        print(f"    Cold (extract + save): {cold_time:.3f}s")
+        print(f"    Warm average (load): {sum(warm_times) / len(warm_times) * 1000:.1f}ms")
+        print(f"  ✅ Cached features match")
+
     except Exception as e:
         print(f"  ❌ Performance test failed: {str(e)}")
+        if strict:
+            raise
+        return False
+
+    # Test 7: Parallel Throughput
+    # Capped so the pytest run stays small on many-core machines
+    n_workers = min(os.cpu_count() or 1, PARALLEL_TEST_MAX_WORKERS)
+    n_files = max(4, 2 * n_workers)
+    print(f"\n[Test 7] Parallel Throughput ({n_files} files, {n_workers} worker processes)")
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # Separate copies so every job writes its own feature file
+            copies = []
+            for i in range(n_files):
+                copy_path = os.path.join(tmp_dir, f'copy_{i}.wav')
+                shutil.copy(test_audio, copy_path)
+                copies.append(copy_path)
+
+            start_ns = time.perf_counter_ns()
+            results = extract_corpus(copies, output_dir=tmp_dir, n_workers=n_workers)
+            wall_time = (time.perf_counter_ns() - start_ns) / 1e9
+
+        assert len(results) == n_files, "Missing results from worker pool"
+
+        throughput = n_files / wall_time
+        # Share of the ideal n_workers x speedup over serial extraction
+        efficiency = median_time * throughput / n_workers
+
+        print(f"  📊 Wall time: {wall_time:.3f}s ({wall_time / n_files:.3f}s per file)")
+        print(f"  📊 Throughput: {throughput:.1f} files/s")
+        print(f"  📊 Per-core efficiency: {efficiency * 100:.0f}% (pool start-up included)")
+        print(f"  ✅ Parallel extraction completed")
+
+    except Exception as e:
+        print(f"  ❌ Parallel throughput test failed: {str(e)}")
+        if strict:
+            raise
         return False
 
     # Summary
@@ -188,7 +344,7 @@ def test_feature_extraction():
     print(f"\n📋 Summary:")
     print(f"  - MFCC coefficients: {mfcc['n_mfcc']} x {mfcc['shape'][1]} frames")
     print(f"  - Chroma features: {chroma['n_chroma']} x {chroma['shape'][1]} frames")
-    print(f"  - Average extraction time: {avg_time:.3f}s")
+    print(f"  - Median extraction time: {median_time:.3f}s")
     print(f"  - Feature file size: {file_size / 1024:.1f} KB")
     print(f"  - Audio duration: {audio_info['duration']:.2f}s")
     print(f"  - Tempo: {audio_info['tempo']:.1f} BPM")
@@ -196,6 +352,11 @@ def test_feature_extraction():
     return True
 
 
+def test_feature_extraction():
+    """Run the feature extraction checks under pytest, failing on the first error"""
+    assert run_feature_extraction_tests(strict=True)
+
+
 def test_api_integration():
     """
     Test feature extraction integration with Flask API
@@ -207,7 +368,8 @@ def test_api_integration():
     print("\n📝 To test the API integration:")
     print("  1. Start the Flask server: python app.py")
     print("  2. Upload a file via the web interface")
-    print("  3. Check that features are extracted and saved")
+    print("  3. Check that features are extracted and saved (upload returns 202,")
+    print("     poll GET /api/features/<file_id> until it returns 200)")
     print("  4. Use GET /api/features to list all features")
     print("  5. Use GET /api/features/<file_id> to retrieve specific features")
 
@@ -227,7 +389,7 @@ def test_api_integration():
 
 if __name__ == '__main__':
     # Run feature extraction tests
-    success = test_feature_extraction()
+    success = run_feature_extraction_tests()
 
     # Show API integration info
     test_api_integration()
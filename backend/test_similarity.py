@@ -7,93 +7,68 @@ Tests DTW and Cosine similarity with audio feature files
 
 import os
 import sys
-import json
+
+from fixtures import FEATURES_DIR, get_similarity_corpus
+
 import numpy as np
 from similarity_calculator import SimilarityCalculator, compare_features
-from feature_extractor import AudioFeatureExtractor
+from feature_extractor import load_feature_file
 import librosa
-import soundfile as sf
 
 
-def create_test_audio_files():
+def dtw_banded_fp64(a, b, radius):
     """
-    Create synthetic test audio files with different similarity levels
+    Plain float64 DTW within a Sakoe-Chiba band, one row of the cost matrix at a time
+
+    Args:
+        a: First sequence (n x k), float64
+        b: Second sequence (m x k), float64
+        radius: Band radius in frames
 
     Returns:
-        List of tuples (filename, description)
+        Accumulated cost at [n, m]
     """
-    print("Creating test audio files...")
-
-    # Create experiments folder if it doesn't exist
-    os.makedirs('experiments', exist_ok=True)
-
-    test_files = []
-
-    # Create a simple sine wave (440 Hz - A note)
-    sr = 22050
-    duration = 3.0
-    t = np.linspace(0, duration, int(sr * duration))
-
-    # File 1: Pure 440 Hz sine wave (A note)
-    y1 = 0.5 * np.sin(2 * np.pi * 440 * t)
-    filename1 = 'experiments/test_audio_440hz.wav'
-    sf.write(filename1, y1, sr)
-    test_files.append((filename1, "440 Hz sine wave (A note)"))
-
-    # File 2: Similar - 440 Hz with slight variation
-    y2 = 0.5 * np.sin(2 * np.pi * 440 * t) * (1 + 0.1 * np.sin(2 * np.pi * 2 * t))
-    filename2 = 'experiments/test_audio_440hz_variation.wav'
-    sf.write(filename2, y2, sr)
-    test_files.append((filename2, "440 Hz with modulation (similar to file 1)"))
-
-    # File 3: Different frequency - 550 Hz (C# note)
-    y3 = 0.5 * np.sin(2 * np.pi * 550 * t)
-    filename3 = 'experiments/test_audio_550hz.wav'
-    sf.write(filename3, y3, sr)
-    test_files.append((filename3, "550 Hz sine wave (C# note - different)"))
-
-    # File 4: Complex tone - chord with multiple frequencies
-    y4 = (0.3 * np.sin(2 * np.pi * 440 * t) +
-          0.3 * np.sin(2 * np.pi * 554 * t) +
-          0.3 * np.sin(2 * np.pi * 659 * t))
-    filename4 = 'experiments/test_audio_chord.wav'
-    sf.write(filename4, y4, sr)
-    test_files.append((filename4, "A major chord (440, 554, 659 Hz)"))
-
-    print(f"Created {len(test_files)} test audio files")
-    return test_files
-
-
-def extract_features_for_test_files(test_files):
+    n, m = len(a), len(b)
+    prev = np.full(m + 1, np.inf)
+    prev[0] = 0.0
+    for i in range(1, n + 1):
+        j0 = max(1, i - radius)
+        j1 = min(m + 1, i + radius + 1)
+        costs = np.linalg.norm(b[j0 - 1:j1 - 1] - a[i - 1], axis=1)
+        curr = np.full(m + 1, np.inf)
+        for j in range(j0, j1):
+            curr[j] = costs[j - j0] + min(prev[j], curr[j - 1], prev[j - 1])
+        prev = curr
+    return prev[m]
+
+
+def fp64_reference(calculator, features1, features2):
     """
-    Extract features for all test files
+    DTW distances and mean cosines of both feature groups in float64
+
+    Baseline for the float32 comparison path: the same banded DTW and
+    cosine on float64 copies of the features.
 
     Args:
-        test_files: List of (filename, description) tuples
+        calculator: SimilarityCalculator whose band ratio is used
+        features1: First prepared features dictionary
+        features2: Second prepared features dictionary
 
     Returns:
-        List of feature file paths
+        Dictionary {group: (dtw_distance, cosine_similarity)}
     """
-    print("\nExtracting features for test files...")
-
-    extractor = AudioFeatureExtractor()
-    feature_files = []
-
-    for filename, description in test_files:
-        print(f"  - {description}")
-
-        # Extract features
-        features, extraction_time = extractor.extract_all_features(filename)
-
-        # Save features
-        base_name = os.path.splitext(os.path.basename(filename))[0]
-        feature_filename = f'features/{base_name}_features.json'
-        extractor.save_features(features, feature_filename)
-
-        feature_files.append(feature_filename)
-        print(f"    Extracted in {extraction_time:.3f}s -> {feature_filename}")
+    reference = {}
+    for group in ('mfcc', 'chroma'):
+        seq1 = np.asarray(calculator.feature_sequence(features1, group), dtype=np.float64)
+        seq2 = np.asarray(calculator.feature_sequence(features2, group), dtype=np.float64)
+        n, m = len(seq1), len(seq2)
+        dtw = dtw_banded_fp64(seq1, seq2, calculator._band_radius(n, m)) / (n + m)
 
-    return feature_files
+        mean1 = np.asarray(features1[group][f'{group}_mean'], dtype=np.float64)
+        mean2 = np.asarray(features2[group][f'{group}_mean'], dtype=np.float64)
+        cosine = mean1 @ mean2 / (np.linalg.norm(mean1) * np.linalg.norm(mean2))
+        reference[group] = (dtw, cosine)
+    return reference
 
 
 def test_similarity_calculations(feature_files, test_files):
@@ -110,6 +85,9 @@ def test_similarity_calculations(feature_files, test_files):
 
     calculator = SimilarityCalculator()
 
+    # Load and prepare every feature file once; the pairs below share them
+    loaded = [calculator.prepare_features(load_feature_file(f, mmap=True)) for f in feature_files]
+
     # Test pairs with expected similarity levels
     test_pairs = [
         (0, 1, "SIMILAR"),    # 440 Hz vs 440 Hz with variation
@@ -131,7 +109,16 @@ def test_similarity_calculations(feature_files, test_files):
         print("-" * 70)
 
         # Compare features
-        comparison = compare_features(feature_files[idx1], feature_files[idx2])
+        comparison = calculator.calculate_overall_similarity(loaded[idx1], loaded[idx2])
+
+        # The float32 path must agree with a float64 baseline
+        reference = fp64_reference(calculator, loaded[idx1], loaded[idx2])
+        for group, (dtw, cosine) in reference.items():
+            result = comparison[f'{group}_comparison']
+            assert np.isclose(result['dtw_distance'], dtw, rtol=1e-4, atol=0), \
+                f"{group} DTW differs from float64: {result['dtw_distance']} vs {dtw}"
+            assert np.isclose(result['cosine_similarity'], cosine, rtol=1e-4, atol=0), \
+                f"{group} cosine differs from float64: {result['cosine_similarity']} vs {cosine}"
 
         # Display results
         print(f"  Overall Similarity: {comparison['overall_similarity']:.2f}%")
@@ -162,11 +149,47 @@ def test_similarity_calculations(feature_files, test_files):
               f"Got: {result['similarity_level']:15s} ({result['overall_similarity']:.2f}%)")
 
 
+def test_corpus_search(feature_files, test_files):
+    """
+    Test LB_Keogh-pruned DTW search against comparing every pair
+
+    Args:
+        feature_files: List of feature file paths
+        test_files: List of (filename, description) tuples
+    """
+    print("\n" + "=" * 70)
+    print("CORPUS SEARCH TEST")
+    print("=" * 70)
+
+    calculator = SimilarityCalculator()
+    corpus = [load_feature_file(f, mmap=True) for f in feature_files]
+    query = corpus[0]
+
+    for idx, features in enumerate(corpus[1:], start=1):
+        bound = calculator.lb_keogh(query['mfcc']['mfcc'], features['mfcc']['mfcc'])
+        distance, _ = calculator.dtw_distance(query['mfcc']['mfcc'], features['mfcc']['mfcc'])
+        assert bound <= distance + 1e-6, "LB_Keogh exceeds DTW distance"
+
+    results = calculator.search(query, corpus, top_k=2)
+    brute_force = sorted(
+        ((idx, calculator.dtw_distance(query['mfcc']['mfcc'], f['mfcc']['mfcc'])[0])
+         for idx, f in enumerate(corpus)),
+        key=lambda result: result[1]
+    )[:2]
+    assert results == brute_force, "Search results differ from exhaustive DTW"
+    assert results[0][0] == 0, "Query should be its own closest match"
+
+    print(f"Query: {test_files[0][1]}")
+    for idx, distance in results:
+        print(f"  {test_files[idx][1]}: DTW distance {distance:.4f}")
+    print("✅ Search matches exhaustive DTW")
+
+
 def test_existing_features():
     """
     Test with existing feature files if available
     """
-    features_dir = 'features'
+    features_dir = FEATURES_DIR
 
     if not os.path.exists(features_dir):
         print("No features directory found")
@@ -202,18 +225,15 @@ def main():
     print("Week 1/12/25 Milestone")
     print("=" * 70)
 
-    # Create features directory if it doesn't exist
-    os.makedirs('features', exist_ok=True)
-
-    # Create test audio files
-    test_files = create_test_audio_files()
-
-    # Extract features
-    feature_files = extract_features_for_test_files(test_files)
+    # Create test audio files and extract their features (shared with pytest)
+    test_files, feature_files = get_similarity_corpus()
 
     # Run similarity tests
     test_similarity_calculations(feature_files, test_files)
 
+    # Run corpus search test
+    test_corpus_search(feature_files, test_files)
+
     # Test with existing features if available
     print("\n" + "=" * 70)
     print("Testing with existing uploaded features (if any):")
@@ -3,14 +3,43 @@ Simple test script for audio upload endpoint
 Week 17/11/25
 """
 
+import asyncio
+import glob
+import gzip
+import importlib.util
+import io
+import json
 import requests
+from requests.adapters import HTTPAdapter
 import os
+import sys
+import time
+
+import pytest
+
+from fixtures import EXPERIMENTS_DIR, TEST_AUDIO
+from feature_extractor import AudioFeatureExtractor
+
+try:
+    from requests_toolbelt import MultipartEncoder
+except ImportError:  # optional, the upload body is built in memory without it
+    MultipartEncoder = None
+
+try:
+    import httpx
+except ImportError:  # optional, only needed for the async pipeline test
+    httpx = None
+
+# One keep-alive session for all requests, so the upload reuses the health
+# check's connection instead of opening a new one
+SESSION = requests.Session()
+SESSION.mount('http://', HTTPAdapter(pool_connections=2, pool_maxsize=4))
 
 def test_upload():
     """Test the upload endpoint with the test audio file"""
 
     url = 'http://localhost:5000/api/upload'
-    test_file = 'experiments/test_audio.wav'
+    test_file = TEST_AUDIO
 
     if not os.path.exists(test_file):
         print(f"❌ Test file not found: {test_file}")
@@ -22,13 +51,19 @@ def test_upload():
     print()
 
     try:
-        # Open and send file
+        # Open and send file, streaming the multipart body from disk when
+        # requests-toolbelt is available instead of building it in memory
         with open(test_file, 'rb') as f:
-            files = {'file': ('test_audio.wav', f, 'audio/wav')}
-            response = requests.post(url, files=files, timeout=30)
+            if MultipartEncoder is not None:
+                body = MultipartEncoder(fields={'file': ('test_audio.wav', f, 'audio/wav')})
+                response = SESSION.post(url, data=body, headers={'Content-Type': body.content_type},
+                                         timeout=30)
+            else:
+                files = {'file': ('test_audio.wav', f, 'audio/wav')}
+                response = SESSION.post(url, files=files, timeout=30)
 
-        # Check response
-        if response.status_code == 200:
+        # Check response (202: features are extracted in the background)
+        if response.status_code in (200, 202):
             data = response.json()
             print("✅ Upload successful!")
             print(f"   Filename: {data['filename']}")
@@ -36,7 +71,8 @@ def test_upload():
             print(f"   Sample Rate: {data['sample_rate']} Hz")
             print(f"   Total Samples: {data['num_samples']:,}")
             print(f"   RMS Energy: {data['rms']:.4f}")
-            print(f"   Waveform samples: {len(data['waveform'])} points")
+            print(f"   Waveform samples: {data['waveform_len']} points ({data['waveform_dtype']})")
+            print(f"   Feature extraction: {data['features']['status']}")
             return True
         else:
             print(f"❌ Upload failed with status {response.status_code}")
@@ -51,12 +87,58 @@ def test_upload():
         print(f"❌ Test failed: {str(e)}")
         return False
 
+def run_upload_batch():
+    """Test the batch upload endpoint with every WAV file in experiments/"""
+
+    url = 'http://localhost:5000/api/upload_batch'
+    paths = sorted(glob.glob(os.path.join(EXPERIMENTS_DIR, '*.wav')))
+
+    if not paths:
+        print("❌ No test files found in experiments/")
+        return False
+
+    print(f"Uploading {len(paths)} files in one request...")
+
+    try:
+        # All files go out as one multipart body, one 'file' part each
+        handles = [open(p, 'rb') for p in paths]
+        try:
+            files = [('file', (os.path.basename(p), f, 'audio/wav')) for p, f in zip(paths, handles)]
+            response = SESSION.post(url, files=files, timeout=60)
+        finally:
+            for f in handles:
+                f.close()
+
+        if response.status_code not in (200, 202):
+            print(f"❌ Batch upload failed with status {response.status_code}")
+            print(f"   Error: {response.json().get('error', 'Unknown error')}")
+            return False
+
+        results = response.json()['files']
+        for result in results:
+            if result['status_code'] in (200, 202):
+                print(f"   ✅ {result['filename']}: {result['duration']:.2f}s, "
+                      f"features {result['features']['status']}")
+            else:
+                print(f"   ❌ {result.get('filename', '?')}: {result['error']}")
+
+        uploaded = sum(result['status_code'] in (200, 202) for result in results)
+        print(f"✅ Batch upload: {uploaded}/{len(paths)} files accepted")
+        return uploaded == len(paths)
+
+    except requests.exceptions.ConnectionError:
+        print("❌ Cannot connect to server. Make sure Flask app is running on port 5000.")
+        return False
+    except Exception as e:
+        print(f"❌ Batch test failed: {str(e)}")
+        return False
+
 def test_health():
     """Test the health check endpoint"""
     url = 'http://localhost:5000/api/health'
 
     try:
-        response = requests.get(url, timeout=5)
+        response = SESSION.get(url, timeout=5)
         if response.status_code == 200:
             data = response.json()
             print(f"✅ Health check: {data['message']}")
@@ -71,6 +153,275 @@ def test_health():
         print(f"❌ Health check failed: {str(e)}")
         return False
 
+async def _async_health_and_upload(test_file):
+    """
+    Health check and upload over one httpx.AsyncClient connection
+
+    The health check and reading the test file run concurrently; the upload
+    only starts once the server has answered the health check.
+
+    Args:
+        test_file: Path of the audio file to upload
+
+    Returns:
+        Tuple of (health response, upload response or None)
+    """
+    def read_file():
+        with open(test_file, 'rb') as f:
+            return f.read()
+
+    # HTTP/2 needs the optional h2 package (and a server that speaks it)
+    http2 = importlib.util.find_spec('h2') is not None
+    async with httpx.AsyncClient(http2=http2, timeout=30) as client:
+        health, payload = await asyncio.gather(
+            client.get('http://localhost:5000/api/health'),
+            asyncio.to_thread(read_file)
+        )
+        if health.status_code != 200:
+            return health, None
+
+        upload = await client.post('http://localhost:5000/api/upload',
+                                   files={'file': ('test_audio.wav', payload, 'audio/wav')})
+        return health, upload
+
+def run_async_pipeline():
+    """Run the health check + upload pipeline with httpx.AsyncClient"""
+    test_file = TEST_AUDIO
+
+    if httpx is None:
+        print("⚠️  httpx is not installed, skipping async pipeline")
+        return None
+    if not os.path.exists(test_file):
+        print(f"❌ Test file not found: {test_file}")
+        return False
+
+    try:
+        health, upload = asyncio.run(_async_health_and_upload(test_file))
+    except httpx.ConnectError:
+        print("❌ Server is not running")
+        return False
+
+    if upload is None:
+        print(f"❌ Health check failed with status {health.status_code}")
+        return False
+    if upload.status_code in (200, 202):
+        data = upload.json()
+        print(f"✅ Async pipeline: {data['filename']} uploaded "
+              f"({upload.http_version}, features {data['features']['status']})")
+        return True
+
+    print(f"❌ Async upload failed with status {upload.status_code}")
+    return False
+
+# ===== Flask test_client tests of the background extraction (no server needed) =====
+
+@pytest.fixture
+def app_module(monkeypatch, tmp_path):
+    """
+    The app module with empty upload/feature folders and a fresh one-worker extraction pool
+
+    Importing app runs its startup code in tmp_path, so no folders are
+    created in the working directory.
+    """
+    monkeypatch.setenv('SKIP_LIBROSA_WARMUP', '1')  # also read by the pool's workers
+    monkeypatch.chdir(tmp_path)
+    import app
+
+    upload_dir = tmp_path / 'uploads'
+    features_dir = tmp_path / 'features'
+    upload_dir.mkdir(exist_ok=True)
+    features_dir.mkdir(exist_ok=True)
+    monkeypatch.setitem(app.app.config, 'UPLOAD_FOLDER', str(upload_dir))
+    monkeypatch.setitem(app.app.config, 'FEATURES_FOLDER', str(features_dir))
+    monkeypatch.setattr(app, 'FEATURES_DIR', str(features_dir))
+    monkeypatch.setattr(app, 'feature_index', {})
+    monkeypatch.setattr(app, 'feature_index_mtime', None)
+    monkeypatch.setattr(app, 'feature_listing_cache', {})
+    monkeypatch.setattr(app, 'pending_extractions', {})
+    monkeypatch.setattr(app, 'EXTRACTION_WORKERS', 1)
+    monkeypatch.setattr(app, 'extraction_executor', None)
+
+    yield app
+
+    if app.extraction_executor is not None:
+        app.extraction_executor.shutdown(wait=True, cancel_futures=True)
+
+
+def upload_test_audio(client, filename='test_audio.wav'):
+    """POST experiments/test_audio.wav to /api/upload and return the response"""
+    with open(TEST_AUDIO, 'rb') as f:
+        return client.post('/api/upload', data={'file': (f, filename)},
+                           content_type='multipart/form-data')
+
+
+def poll_features(client, file_id, timeout=60):
+    """Poll GET /api/features/<file_id>?status=1 until it stops returning 202, then GET the features"""
+    deadline = time.monotonic() + timeout
+    while True:
+        response = client.get(f'/api/features/{file_id}?status=1')
+        if response.status_code != 202 or time.monotonic() > deadline:
+            break
+        assert not response.data
+        time.sleep(0.05)
+    if response.status_code == 200:
+        assert not response.data
+        return client.get(f'/api/features/{file_id}')
+    return response
+
+
+def wait_until(condition, timeout=10):
+    """Wait for a done callback of the extraction pool to take effect"""
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return condition()
+
+
+def test_upload_then_poll_features(app_module):
+    """An upload returns 202, polling returns the features once they are saved"""
+    client = app_module.app.test_client()
+
+    response = upload_test_audio(client)
+    assert response.status_code == 202
+    data = response.get_json()
+    assert data['features']['status'] == 'pending'
+    file_id = data['file_id']
+
+    response = poll_features(client, file_id)
+    assert response.status_code == 200
+    features = response.get_json()['features']
+    assert features['audio_info']['filename'] == f'test_audio_{file_id}.wav'
+    assert features['mfcc']['shape'][0] == 13
+
+    # The done callback removes the marker and upload and precompresses the response
+    upload_dir = app_module.app.config['UPLOAD_FOLDER']
+    assert wait_until(lambda: not os.listdir(upload_dir)), os.listdir(upload_dir)
+    assert wait_until(lambda: glob.glob(os.path.join(app_module.FEATURES_DIR, '*.json.gz')))
+
+    response = client.get(f'/api/features/{file_id}', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(response.data))['features'] == features
+
+    # Same content again: served from the saved features
+    response = upload_test_audio(client, 'copy.wav')
+    assert response.status_code == 200
+    assert response.get_json()['features']['status'] == 'cached'
+
+
+def test_failed_precompression_still_indexes_features(app_module, monkeypatch):
+    """A precompression error in the done callback doesn't leave the upload or a stale index behind"""
+    def fail(*args, **kwargs):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(app_module, 'precompress_features', fail)
+    # Only the callback's own index update can find the file
+    monkeypatch.setattr(app_module, 'refresh_feature_index', lambda: None)
+    client = app_module.app.test_client()
+
+    response = upload_test_audio(client)
+    assert response.status_code == 202
+    file_id = response.get_json()['file_id']
+
+    upload_dir = app_module.app.config['UPLOAD_FOLDER']
+    assert wait_until(lambda: not os.listdir(upload_dir)), os.listdir(upload_dir)
+    assert file_id in app_module.feature_index
+    assert poll_features(client, file_id).status_code == 200
+
+
+def test_failed_extraction_leaves_nothing_behind(app_module, monkeypatch):
+    """A failing extraction reports 500 and removes its marker, upload and features"""
+    def fail(*args, **kwargs):
+        raise RuntimeError('extraction failed')
+
+    # Patched before the pool forks its worker
+    monkeypatch.setattr(AudioFeatureExtractor, 'extract_all_features_from_array', fail)
+    client = app_module.app.test_client()
+
+    response = upload_test_audio(client)
+    assert response.status_code == 202
+    file_id = response.get_json()['file_id']
+
+    response = poll_features(client, file_id)
+    assert response.status_code == 500
+    assert 'extraction failed' in response.get_json()['error']
+
+    upload_dir = app_module.app.config['UPLOAD_FOLDER']
+    assert wait_until(lambda: not os.listdir(upload_dir)), os.listdir(upload_dir)
+    assert not os.listdir(app_module.FEATURES_DIR)
+    assert client.get(f'/api/features/{file_id}').status_code == 404
+
+
+def test_pool_rebuilt_after_worker_dies(app_module, monkeypatch):
+    """A worker killed mid-extraction breaks the pool; the next upload gets a new one"""
+    extract = AudioFeatureExtractor.extract_all_features_from_array
+
+    def die(*args, **kwargs):
+        os._exit(1)
+
+    monkeypatch.setattr(AudioFeatureExtractor, 'extract_all_features_from_array', die)
+    client = app_module.app.test_client()
+
+    response = upload_test_audio(client)
+    assert response.status_code == 202
+    file_id = response.get_json()['file_id']
+    broken_executor = app_module.extraction_executor
+
+    response = poll_features(client, file_id)
+    assert response.status_code == 500
+
+    upload_dir = app_module.app.config['UPLOAD_FOLDER']
+    assert wait_until(lambda: app_module.extraction_executor is None)
+    assert wait_until(lambda: not os.listdir(upload_dir)), os.listdir(upload_dir)
+
+    # The replacement pool forks after the patch is undone
+    monkeypatch.setattr(AudioFeatureExtractor, 'extract_all_features_from_array', extract)
+    response = upload_test_audio(client)
+    assert response.status_code == 202
+    assert app_module.extraction_executor is not broken_executor
+
+    response = poll_features(client, file_id)
+    assert response.status_code == 200
+
+def test_upload_batch(app_module, monkeypatch):
+    """/api/upload_batch reports each file on its own and enforces the batch limits"""
+    client = app_module.app.test_client()
+    with open(TEST_AUDIO, 'rb') as f:
+        audio = f.read()
+
+    def post_batch(parts):
+        return client.post('/api/upload_batch', content_type='multipart/form-data',
+                           data={'file': [(io.BytesIO(data), name) for name, data in parts]})
+
+    # Only the batch route lifts the body limit: the batch is larger than
+    # MAX_CONTENT_LENGTH, and so is the single upload that gets rejected
+    monkeypatch.setitem(app_module.app.config, 'MAX_CONTENT_LENGTH', len(audio) + 64 * 1024)
+    parts = [('a.wav', audio), ('b.wav', audio), ('notes.txt', b'not audio'), ('broken.wav', b'not a wav')]
+    response = post_batch(parts)
+    assert response.status_code == 202
+    results = response.get_json()['files']
+    assert [r['status_code'] for r in results] == [202, 202, 400, 500]
+    assert results[0]['file_id'] == results[1]['file_id']
+    assert results[2]['filename'] == 'notes.txt'
+    assert 'File type not allowed' in results[2]['error']
+    assert 'Error processing audio file' in results[3]['error']
+
+    response = client.post('/api/upload', content_type='multipart/form-data',
+                           data={'file': (io.BytesIO(audio * 2), 'big.wav')})
+    assert response.status_code == 413
+
+    assert poll_features(client, results[0]['file_id']).status_code == 200
+
+    # Batch limits: file count and total body size
+    monkeypatch.setattr(app_module, 'MAX_BATCH_FILES', 2)
+    response = post_batch([('a.wav', audio)] * 3)
+    assert response.status_code == 400
+    assert 'Too many files' in response.get_json()['error']
+
+    monkeypatch.setattr(app_module, 'MAX_BATCH_SIZE', len(audio))
+    response = post_batch([('a.wav', audio), ('b.wav', audio)])
+    assert response.status_code == 413
+
 if __name__ == '__main__':
     print("=" * 60)
     print("Audio Upload & Waveform Display - Test Script")
@@ -86,6 +437,16 @@ if __name__ == '__main__':
         # Test upload
         print("2. Testing upload endpoint...")
         test_upload()
+        print()
+
+        # Test the async client pipeline
+        print("3. Testing async health + upload pipeline...")
+        run_async_pipeline()
+        print()
+
+        # Test the batch endpoint
+        print("4. Testing batch upload endpoint...")
+        run_upload_batch()
     else:
         print()
         print("Server is not running. Start it with:")